@@ -1,25 +1,26 @@
 #!/usr/bin/env python3
 
 from gromacs import Gromacs
+from openmpi import OpenMPI
+from scan    import Scan
 
 gmx = Gromacs(
-    prefix = '../run/GROMACS', 
-    input  = '../input/GROMACS/water_1536.tpr', 
-    nsteps = 4000 )  
+    prefix = '../run/GROMACS',
+    input  = '../input/GROMACS/water_1536.tpr',
+    nsteps = 4000,
+    mpi    = OpenMPI() )
 
 gmx.info()
 gmx.build()
 
-for nodes in [1]: 
-    for ntasks in [8, 16, 32, 40]:
-        omp = 1 
-        while omp <= int(40/ntasks): 
-            gmx.nodes  = nodes
-            gmx.ntasks = ntasks
-            gmx.omp    = omp 
+# independent configurations run concurrently on free nodes
+scan = Scan(
+    gmx,
+    node   = [1],
+    task   = [8, 16, 32, 40],
+    omp    = [1, 2, 4],
+    select = lambda config: config['task']*config['omp'] <= 40 )
 
-            gmx.run()
-
-            omp *= 2 
+scan.run()
 
 gmx.summary()
@@ -1,21 +1,28 @@
-#!/usr/bin/env python3 
+#!/usr/bin/env python3
 
-from hpl import Hpl
+from hpl_cuda import HplCuda
+from openmpi  import OpenMPI
+from scan     import Scan
 
-hpl = Hpl(
+hpl = HplCuda(
     prefix    = '../run/HPL',
     sif       = '../image/hpc-benchmarks:21.4-hpl.sif',
-    blocksize = ['256'] ) 
+    blocksize = [256],
+    mpi       = OpenMPI() )
 
 hpl.info()
 
-for nodes in [1]: 
-    for ngpus in [1, 2, 4, 6, 8]:
-        for omp in [1, 2, 4]: 
-            hpl.nodes = nodes
-            hpl.ngpus = ngpus
-            hpl.omp   = omp
-        
-            hpl.run() 
+# single node configurations share the node by GPU,
+# block sizes of the same resources are batched into one HPL.dat
+scan = Scan(
+    hpl,
+    node      = [1],
+    gpu       = [1, 2, 4, 6, 8],
+    task      = [1, 2, 4, 6, 8],
+    omp       = [1, 2, 4],
+    blocksize = [256, 288],
+    select    = lambda config: config['task'] == config['gpu'] )
+
+scan.run()
 
 hpl.summary()
@@ -1,20 +1,43 @@
 #!/usr/bin/env python3
 
-from ior import Ior
+from ior     import Ior
+from openmpi import OpenMPI
 
 ior = Ior(
-    prefix = '../run/IOR' )
+    prefix = '../run/IOR',
+    mpi    = OpenMPI() )
 
 ior.info()
 ior.build()
 
-for nodes in [1, 2]: 
-    for ntasks in [1, 2, 4, 8]: 
+# scaling of the default pattern (POSIX, N-N, random) over nodes and tasks
+for node in [1, 2]:
+    for task in [1, 2, 4, 8]:
         for block in ['16m', '64m', '256m']:
-            ior.nodes  = nodes 
-            ior.ntasks = ntasks
-            ior.block  = block
+            ior.mpi.node = node
+            ior.mpi.task = task
+            ior.block    = block
 
-            ior.run() 
+            ior.run()
+
+# access patterns are measured one at a time on the shared filesystem (full allocation)
+ior.mpi.node = 2
+ior.mpi.task = 8
+
+for api, layout, collective in [
+    ('POSIX', 'N-N', False),
+    ('POSIX', 'N-1', False),
+    ('MPIIO', 'N-1', False),
+    ('MPIIO', 'N-1', True ) ]:
+
+    for order in ['seq', 'random']:
+        for block in ['16m', '64m', '256m']:
+            ior.api        = api
+            ior.layout     = layout
+            ior.collective = collective
+            ior.order      = order
+            ior.block      = block
+
+            ior.run()
 
 ior.summary()
@@ -1,19 +1,20 @@
 #!/usr/bin/env python3
 
 from stream_omp import StreamOmp
+from scan       import Scan
 
 stream = StreamOmp(
     prefix = '../run/STREAM/OMP' )
 
-stream.info() 
+stream.info()
 stream.build()
 
-# scan affinity/thread 
-for affinity in ['close', 'spread']: 
-    for thread in [1, 2, 4, 8, 16, 24, 32, 40]: 
-        stream.affinity = affinity
-        stream.thread   = thread 
+# scan affinity/thread
+scan = Scan(
+    stream,
+    affinity = ['close', 'spread'],
+    omp      = [1, 2, 4, 8, 16, 24, 32, 40] )
 
-        stream.run() 
+scan.run()
 
-stream.summary() 
+stream.summary()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import logging
+import resource
+
+from topology import read
+
+# rusage fields of waited-for children, maxrss is a high-water mark rather than a counter
+fields = {
+    'utime'  : 'ru_utime',                  # user cpu time (s)
+    'stime'  : 'ru_stime',                  # system cpu time (s)
+    'majflt' : 'ru_majflt',                 # major page faults
+    'minflt' : 'ru_minflt',                 # minor page faults
+    'nvcsw'  : 'ru_nvcsw',                  # voluntary context switches
+    'nivcsw' : 'ru_nivcsw' }                # involuntary context switches
+
+# high-water marks (kB) instead of counters
+peaks = ['maxrss', 'cg_memory_peak']
+
+# resource usage of a benchmark command on the local node: child rusage and cgroup v2 counters of the Slurm job,
+# ranks started on other nodes by the MPI launcher are not accounted for
+#
+# rusage covers the launcher and the ranks it forks (mpirun), ranks of srun steps are children of slurmstepd instead.
+# cgroup counters cover every process of the job on this node, i.e. also background samplers and concurrent scan jobs
+class Accounting:
+    def __init__(self, root='/'):
+        self.root   = root
+        self.cgroup = self.find_cgroup()
+
+        self.before = {}
+        self.usage  = {}
+
+    def path(self, *path):
+        return os.path.join(self.root, *path)
+
+    # unified hierarchy of this process, the root cgroup is not a job
+    def find_cgroup(self):
+        match = re.search(r'^0::(/.+)$', read(self.path('proc/self/cgroup')), re.MULTILINE)
+
+        if not match:
+            return None
+
+        # .../job_<id>/step_batch/user/task_0: srun ranks run in sibling step_<n> cgroups, the job contains them all
+        cgroup = re.sub(r'(/job_\d+)/.*$', r'\1', match.group(1)).lstrip('/')
+
+        if os.path.isdir(self.path('sys/fs/cgroup', cgroup)):
+            return self.path('sys/fs/cgroup', cgroup)
+
+    def start(self):
+        self.before = self.counters()
+
+    def stop(self):
+        after      = self.counters()
+        self.usage = {}
+
+        for name in after:
+            if name in self.before and name not in peaks:
+                self.usage[name] = after[name] - self.before[name]
+
+        # high-water marks only tell about this run if they rose
+        for name in peaks:
+            if name in after:
+                self.usage[name] = after[name] if after[name] > self.before.get(name, 0) else '-'
+
+    def counters(self):
+        usage   = resource.getrusage(resource.RUSAGE_CHILDREN)
+        counter = {name: getattr(usage, field) for name, field in fields.items()}
+
+        counter['maxrss'] = usage.ru_maxrss     # kB
+
+        if self.cgroup:
+            counter.update(self.cgroup_counters())
+
+        return counter
+
+    def cgroup_counters(self):
+        counter = {}
+
+        # usage_usec, user_usec, system_usec, nr_throttled, throttled_usec
+        for line in read(os.path.join(self.cgroup, 'cpu.stat')).splitlines():
+            name, value = line.split()
+            counter[f'cg_{name}'] = int(value)
+
+        peak = read(os.path.join(self.cgroup, 'memory.peak'))
+
+        if peak.isdigit():
+            counter['cg_memory_peak'] = int(peak)//1024
+
+        # MAJ:MIN rbytes=.. wbytes=.. rios=.. wios=.. summed over devices
+        for line in read(os.path.join(self.cgroup, 'io.stat')).splitlines():
+            for name, value in re.findall(r'(\w+)=(\d+)', line):
+                counter[f'cg_{name}'] = counter.get(f'cg_{name}', 0) + int(value)
+
+        return counter
+
+    # children: ranks are waited-for children of this process, otherwise rusage is dropped
+    def summary(self, children=True):
+        usage = {name: value for name, value in self.usage.items() if children or name.startswith('cg_')}
+
+        if 'utime' in usage:
+            rss = '-' if usage['maxrss'] == '-' else f'{usage["maxrss"]//1024} MB'
+
+            logging.info(
+                f'{"Usage":7} : '
+                f'cpu {usage["utime"]+usage["stime"]:.1f}s, '
+                f'rss {rss}, '
+                f'faults {usage["majflt"]}/{usage["minflt"]}, '
+                f'switches {usage["nvcsw"]}/{usage["nivcsw"]}' )
+        elif 'cg_usage_usec' in usage:
+            rss = '-' if usage.get('cg_memory_peak', '-') == '-' else f'{usage["cg_memory_peak"]//1024} MB'
+
+            logging.info(
+                f'{"Usage":7} : '
+                f'cpu {usage["cg_usage_usec"]/10**6:.1f}s, '
+                f'rss {rss} (job cgroup)' )
+
+        return usage
@@ -5,9 +5,13 @@ import re
 import logging
 import argparse
 
-from bmt import Bmt
+from bmt     import Bmt
+from pattern import Pattern
 
 class BabelStream(Bmt):
+    pattern = Pattern(
+        kernel = r'^(Copy|Mul|Add|Triad|Dot):?[ \t]+(\S+)' )
+
     def __init__ (self, size=eval('2**25'), ntimes=100, **kwargs):
         super().__init__(**kwargs)
 
@@ -34,7 +38,7 @@ class BabelStream(Bmt):
         super().build()
 
     def runcmd(self): 
-        cmd = [
+        cmd = self.profiler() + [
             self.bin, 
                f'-s {str(self.size)}', 
                f'-n {str(self.ntimes)}' ]
@@ -45,14 +49,8 @@ class BabelStream(Bmt):
 
         key = self.param() 
 
-        with open(self.output, 'r') as output_fh:
-            for line in output_fh:
-                for kernel in ['Copy', 'Mul', 'Add', 'Triad', 'Dot']: 
-                    if re.search(f'{kernel}:?', line):
-                        if not self.result[key][kernel]: 
-                            self.result[key][kernel] = []
-
-                        self.result[key][kernel].append(float(line.split()[1])/1000)
+        for name, (kernel, bandwidth) in self.pattern.parse(self.output):
+            self.record(key, kernel, float(bandwidth)/1000)
 
     def param(self): 
         pass
@@ -3,22 +3,17 @@
 import os
 import re
 import sys
-import time
-import inspect
 import logging
 import argparse
 import datetime
 import prerequisite
-import packaging.version
-
-from tabulate import tabulate
-from statistics import mean
-from pprint import pprint
 
 from cpu import lscpu, cpu_info
 from gpu import gpu_info
 from env import module_list
 from slurm import slurm_nodelist
+from stats import median, cv, ci, relative_ci, outliers, reject
+from store import Store
 from utils import syscmd, autovivification
 
 class Bmt:
@@ -31,7 +26,7 @@ class Bmt:
         format = '%(message)s')
         #format = '[%(levelname)-5s] %(message)s')
 
-    def __init__(self, repeat=1, prefix='./', outdir=None):
+    def __init__(self, repeat=1, prefix='./', outdir=None, settle=None, cooldown=0, resume=False, telemetry=None, energy=None, accounting=None, profile=None, ci=0, min_repeat=3, max_repeat=10):
         self.name     = ''
 
         # parse $SLUM_NODELIST
@@ -44,10 +39,36 @@ class Bmt:
         # number of repeted measurements
         self.repeat   = repeat
 
+        # adaptive repetition: repeat until the relative 95% CI of the main metric is below ci
+        self.ci         = ci
+        self.min_repeat = min_repeat
+        self.max_repeat = max_repeat
+        self.metric     = None
+        self.recorded   = set()
+
+        # wait for node to become idle between measurements
+        self.settle   = settle
+        self.cooldown = cooldown
+
+        # node state of the launch node sampled during each run, summary columns next to result table
+        self.telemetry = telemetry
+        self.parsed    = set()
+
+        # energy to solution and (metric, scale, unit) of perf-per-watt, set by subclasses
+        self.energy     = energy
+        self.efficiency = None
+
+        # child rusage and cgroup counters of each run (store only)
+        self.accounting = accounting
+
+        # perf stat events per rank: comma separated list or 'default' (--profile)
+        self.profile    = profile
+        self.perf       = None
+
         # Build directory setup
         self.bin       = []
         self.prefix    = os.path.abspath(prefix)
-        self.rootdir   = os.path.dirname(inspect.stack()[-1][1])
+        self.rootdir   = os.path.dirname(os.path.abspath(sys.argv[0]))
         self.bindir    = os.path.join(self.prefix, 'bin')
         self.builddir  = os.path.join(self.prefix, 'build')
 
@@ -71,6 +92,19 @@ class Bmt:
         self.table    = []
         self.result   = autovivification()
 
+        # per-run context shown after the results (telemetry, energy), not part of repeat or CI logic
+        self.annotation = autovivification()
+
+        # persistent result store shared by all runs under the same prefix
+        self.store    = Store(os.path.join(os.path.dirname(self.outdir), 'bmt.db'), self.outdir)
+
+        # skip configurations measured in previous output directories
+        self.resume   = resume
+        self.replay   = False
+
+        # tuning probes: neither stored nor settled
+        self.transient = False
+
         # Command line arguments
         self.parser   = argparse.ArgumentParser(
             formatter_class = lambda prog: argparse.HelpFormatter(prog, max_help_position=40, width=100))
@@ -82,10 +116,15 @@ class Bmt:
 
     # print object attributeis for debug purpose
     def debug(self):
+        from pprint import pprint
+
         pprint(vars(self))
 
     # check for minimum software/hardware requirements
     def check_prerequisite(self, module, min_ver):
+        # deferred: only needed when building
+        import packaging.version
+
         cmd     = prerequisite.cmd[module]
         regex   = prerequisite.regex[module]
         version = re.search(regex, syscmd([cmd])).group(1)
@@ -110,22 +149,252 @@ class Bmt:
         for cmd in self.buildcmd:
             syscmd(cmd)
 
+    # deferred: default samplers are constructed on first use, not for every benchmark object
+    @property
+    def settle(self):
+        if self._settle is None:
+            from settle import Settle
+
+            self._settle = Settle()
+
+        return self._settle
+
+    @settle.setter
+    def settle(self, settle):
+        self._settle = settle
+
+    @property
+    def telemetry(self):
+        if self._telemetry is None:
+            from telemetry import Telemetry
+
+            self._telemetry = Telemetry()
+
+        return self._telemetry
+
+    @telemetry.setter
+    def telemetry(self, telemetry):
+        self._telemetry = telemetry
+
+    @property
+    def energy(self):
+        if self._energy is None:
+            from energy import Energy
+
+            self._energy = Energy()
+
+        return self._energy
+
+    @energy.setter
+    def energy(self, energy):
+        self._energy = energy
+
+    @property
+    def accounting(self):
+        if self._accounting is None:
+            from accounting import Accounting
+
+            self._accounting = Accounting()
+
+        return self._accounting
+
+    @accounting.setter
+    def accounting(self, accounting):
+        self._accounting = accounting
+
     def run(self, redirect=0):
-        for i in range(1, self.repeat+1): 
-            if self.repeat > 1: 
+        for i in self.repeats(): 
+            if self.limit() > 1: 
                 self.output = re.sub('out(\.\d+)?', f'out.{i}', self.output)
-        
+
+            if self.resume and self.restore(i):
+                continue
+
             logging.info(f'{"Output":7} : {os.path.join(self.outdir, self.output)}')
                 
             # redirect output to file
-            if redirect:
-                syscmd(self.runcmd(), self.output)
-            else:
-                syscmd(self.runcmd())
+            status = self.monitor(self.runcmd(), self.output if redirect else None)
 
             self.parse()
+            self.annotate()
+
+            if not self.transient:
+                self.complete(i, status is None)
+                self.settle.wait(self.cooldown)
+
+    # command with telemetry sampled in background, time series is saved next to output 
+    def monitor(self, cmd, output=None):
+        self.parsed = set()
+
+        self.telemetry.start(gpu=bool(self.device))
+
+        if self.efficiency:
+            self.energy.start(self.nodes(), gpu=bool(self.device))
+
+        # rusage window excludes the children of samplers and energy readings, cgroup counters do not
+        self.accounting.start()
+
+        try:
+            status = syscmd(cmd, output)
+        finally:
+            self.accounting.stop()
+            self.telemetry.stop()
+
+            if self.efficiency:
+                self.energy.stop()
+
+        self.telemetry.save(self.output)
+
+        if self.efficiency:
+            self.energy.save(self.output)
+
+        return status
+
+    # nodes running the benchmark command
+    def nodes(self):
+        return ['localhost']
+
+    # benchmark processes are waited-for children (rusage)
+    def children(self):
+        return True
+
+    # telemetry and energy summary of the last run for every key it produced
+    def annotate(self):
+        if self.telemetry.interval:
+            self.annotate_telemetry()
+
+        if self.efficiency:
+            self.annotate_energy()
+
+        if not self.replay:
+            self.annotate_usage()
+
+        if self.profile:
+            self.annotate_counters()
+
+    # ranks on other nodes of an MPI job are not sampled
+    def annotate_telemetry(self):
+        summary = self.telemetry.summary()
+
+        for key in list(self.parsed):
+            repeat = len(next(iter(self.result[key].values())))
+
+            for metric in summary:
+                if metric in self.telemetry.columns:
+                    self.attach(key, self.telemetry.columns[metric], summary[metric])
+
+                self.archive(key, metric, summary[metric], repeat)
+
+    # mean power over the run, energy over the runtime of each key (e.g. HPL with several configurations)
+    def annotate_energy(self):
+        metric, scale, unit = self.efficiency
+        joules = self.energy.total()
+
+        for key in list(self.parsed):
+            result = self.result[key]
+            repeat = len(next(iter(result.values())))
+
+            # unreadable or frozen counters (no joules over the run)
+            if joules == '-' or not joules or not self.energy.elapsed:
+                power, energy, efficiency = '-', '-', '-'
+            else:
+                power   = joules/self.energy.elapsed
+                runtime = result['time'][-1] if 'time' in result and result['time'][-1] != '-' else self.energy.elapsed
+                perf    = result[metric][-1] if metric in result else '-'
+
+                energy     = power*runtime/1000
+                efficiency = '-' if perf == '-' else perf*scale/power
+
+            self.attach(key, 'energy(kJ)', energy)
+            self.attach(key, unit, efficiency)
 
-            time.sleep(5)
+            for name, value in [('energy', energy), ('efficiency', efficiency), ('power', power)]:
+                self.archive(key, name, value, repeat)
+
+    def annotate_usage(self):
+        usage = self.accounting.summary(self.children())
+
+        for key in list(self.parsed):
+            repeat = len(next(iter(self.result[key].values())))
+
+            for metric in usage:
+                self.archive(key, metric, usage[metric], repeat)
+
+    # perf stat wrapper in front of the benchmark executable
+    def profiler(self):
+        if not self.profile:
+            return []
+
+        if not self.perf:
+            # deferred: only needed with --profile
+            from perf import Perf
+
+            self.perf = Perf(self.profile if isinstance(self.profile, str) else 'default')
+
+            if not self.perf.core:
+                logging.warning('perf stat is not available, profiling is skipped!')
+
+        if not self.perf.core:
+            return []
+
+        return [self.perf.wrap(os.path.join(self.outdir, self.output))]
+
+    # counters summed over ranks and derived IPC, GFLOP/s, GB/s and byte/flop (store only)
+    def annotate_counters(self):
+        # runcmd without profiler(): warned once
+        if not self.perf and not self.replay:
+            logging.warning(f'Profiling is not supported by {self.name}!')
+
+            self.profile = None
+            return
+
+        from perf import collect, derive
+
+        counters = collect(os.path.join(self.outdir, self.output))
+        derived  = derive(counters)
+
+        if derived:
+            logging.info(
+                f'{"Perf":7} : ' + ', '.join(
+                    f'{name[3:]} {value:.2f}' for name, value in derived.items()))
+
+        for key in list(self.parsed):
+            repeat = len(next(iter(self.result[key].values())))
+
+            for metric, value in {**counters, **derived}.items():
+                self.archive(key, metric, value, repeat)
+
+    # repeat index, stops early once all results of the configuration have converged (--ci)
+    def repeats(self):
+        self.recorded = set()
+
+        for i in range(1, self.limit()+1):
+            yield i
+
+            if self.converged(i):
+                if i < self.limit():
+                    logging.info(f'{"Repeat":7} : converged after {i} runs')
+
+                return
+
+    def limit(self):
+        return self.max_repeat if self.ci else self.repeat
+
+    # main metric (default: first recorded) of every key without outliers
+    def converged(self, repeat):
+        if not self.ci or repeat < self.min_repeat:
+            return False
+
+        for key in self.recorded:
+            samples = self.result[key][self.metric or next(iter(self.result[key]))]
+
+            if not samples or '-' in samples:
+                continue
+
+            if relative_ci(reject(samples)) > self.ci:
+                return False
+
+        return True
 
     def runcmd(self): 
         pass
@@ -133,6 +402,77 @@ class Bmt:
     def parse(self):
         pass
 
+    # configuration fields known before the run (result key)
+    def param(self):
+        pass
+
+    # configuration identity across output directories
+    def fingerprint(self):
+        import hashlib
+
+        stem = re.sub('\.\d+$', '', os.path.basename(self.output))
+
+        return hashlib.sha1(f'{self.name}:{self.param()}:{stem}'.encode()).hexdigest()
+
+    def complete(self, repeat, failed=False):
+        self.store.complete(self.fingerprint(), repeat, os.path.abspath(self.output), int(failed))
+
+    # re-parse output of a previous run instead of running it again
+    def restore(self, repeat):
+        previous = self.store.lookup(self.fingerprint(), repeat)
+
+        if not previous:
+            return False
+
+        logging.info(f'{"Resume":7} : {previous}')
+
+        output, self.output = self.output, previous
+        self.replay = True
+
+        self.parsed = set()
+        self.parse()
+
+        # saved time series and energy of the previous run
+        self.telemetry.load(previous)
+
+        if self.efficiency:
+            self.energy.load(previous)
+
+        self.annotate()
+
+        self.output = output
+        self.replay = False
+
+        return True
+
+    # append measurement to result table and persistent store
+    def record(self, key, metric, value):
+        if not self.result[key][metric]:
+            self.result[key][metric] = []
+
+        self.result[key][metric].append(value)
+        self.recorded.add(key)
+        self.parsed.add(key)
+
+        self.archive(key, metric, value, len(self.result[key][metric]))
+
+    # summary column of the latest run of key, see columns()
+    def attach(self, key, column, value):
+        if not self.annotation[key][column]:
+            self.annotation[key][column] = []
+
+        self.annotation[key][column].append(value)
+
+    # persistent store only, e.g. auxiliary timings that are not part of summary
+    def archive(self, key, metric, value, repeat):
+        # restored results are already in the store
+        if self.replay or self.transient:
+            return
+
+        row = key.split(',')
+
+        self.store.insert(self.name, dict(zip(self.header[0:len(row)], row)), metric, value, repeat)
+
     def info(self):
         cpu_info(self.host)
 
@@ -142,6 +482,9 @@ class Bmt:
         module_list()
 
     def summary(self):
+        # deferred: only needed at the end of a run
+        from tabulate import tabulate
+
         sys_info = self.host['Model']
 
         if self.device:
@@ -157,6 +500,12 @@ class Bmt:
             for perf in self.result[key]:
                 row.append(self.__cell_format(self.result[key][perf]))
 
+            # annotations line up with their header even if a metric is missing
+            row += ['-'] * (len(self.header) - len(row))
+
+            for column in self.columns():
+                row.append(self.__cell_format(self.annotation[key][column]) if self.annotation[key][column] else '-')
+
             self.table.append(row)
 
         # sort data
@@ -166,11 +515,26 @@ class Bmt:
             #  else:
                 #  self.result =  sorted(self.result, key=lambda x : float(x[-1]))
 
-        print(tabulate(self.table, self.header, tablefmt='pretty', stralign='center', numalign='center'))
+        print(tabulate(self.table, self.header + self.columns(), tablefmt='pretty', stralign='center', numalign='center'))
+
+    # annotation columns after the result metrics
+    def columns(self):
+        columns = list(self.telemetry.columns.values()) if self.telemetry.interval else []
+
+        if self.efficiency:
+            columns += ['energy(kJ)', self.efficiency[2]]
+
+        return columns
 
     def add_argument(self): 
-        self.parser.add_argument('-v', '--version' , action='version', version='%(prog)s ' + self.version)
-        self.parser.add_argument('--repeat' , type=int, help='number of repeated measurements')
+        self.parser.add_argument('-v', '--version'   , action='version', version='%(prog)s ' + self.version)
+        self.parser.add_argument('--repeat'    , type=int, help='number of repeated measurements')
+        self.parser.add_argument('--cooldown'  , type=float, help='maximum wait for idle node between measurements (default: 30s)')
+        self.parser.add_argument('--resume'    , action='store_true', help='skip configurations measured in previous runs')
+        self.parser.add_argument('--profile'   , type=str, nargs='?', const='default', metavar='EVENTS', help='perf stat per rank (default events: cycles, instructions, LLC, FP, IMC)')
+        self.parser.add_argument('--ci'        , type=float, help='repeat until relative 95%% confidence interval is below (e.g. 0.02)')
+        self.parser.add_argument('--min_repeat', type=int, help='minimum number of repeats with --ci (default: 3)')
+        self.parser.add_argument('--max_repeat', type=int, help='maximum number of repeats with --ci (default: 10)')
 
     def getopt(self):
         self.add_argument()
@@ -186,10 +550,13 @@ class Bmt:
             if item == '-':
                 return '-'
 
-        average = mean(cell)
-
-        if self.repeat > 1:
-            formatted = "\n".join(list(map("{:.2f}".format, cell)) + [f'-<{average:.2f}>-'])
+        # repeated measurements or samples within a run: outliers (*) are excluded from median, CV and CI
+        if len(cell) > 1:
+            rejected  = outliers(cell)
+            samples   = reject(cell)
+            formatted = "\n".join(
+                [f'{value:.2f}' + ('*' if index in rejected else '') for index, value in enumerate(cell)] + 
+                [f'-<{median(samples):.2f}>-', f'cv {cv(samples):.1%}', f'ci {ci(samples):.2f}'])
         else:
             formatted = f'{cell[0]:.2f}'
 
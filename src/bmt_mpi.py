@@ -29,6 +29,13 @@ class BmtMpi(Bmt):
         if not self.mpi.omp:
             self.mpi.omp = 1
 
+    def nodes(self):
+        return self.nodelist[0:int(self.mpi.node)]
+
+    # srun ranks are forked by slurmstepd
+    def children(self):
+        return not self.mpi.slurm
+
     @property
     def sif(self): 
         return self._sif 
@@ -58,6 +65,10 @@ class BmtMpi(Bmt):
         else: 
             runcmd = [self.execmd()]
 
+        # perf stat per rank, outside of the container 
+        if self.profile: 
+            runcmd.insert(-1, self.profiler())
+
         # singularity 
         if self.sif: 
             runcmd.insert(-1, ['singularity', 'run', f'--nv {self.sif}'])
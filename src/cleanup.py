@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+import os
+import glob
+import time
+import logging
+import threading
+import itertools
+
+from concurrent.futures import ThreadPoolExecutor
+
+# background removals, joined by wait() and at interpreter exit (forked workers must call wait() themselves)
+pending = []
+counter = itertools.count()
+
+# remove files and directory trees matching patterns with a pool of unlink workers, returns (files, bytes)
+# background: paths are moved aside first so that the next run can reuse their names, nothing is removed yet (0, 0),
+# files and bytes are logged when done
+def remove(patterns, background=False, workers=16):
+    paths = sorted(set(path for pattern in patterns for path in glob.glob(pattern)))
+
+    if not paths:
+        return 0, 0
+
+    if background:
+        thread = threading.Thread(target=purge, args=(trash(paths), workers))
+        thread.start()
+
+        pending.append(thread)
+
+        return 0, 0
+
+    return purge(paths, workers)
+
+def wait():
+    while pending:
+        pending.pop().join()
+
+# rename into a hidden directory next to each path (same filesystem, no data is moved)
+def trash(paths):
+    moved = []
+    bins  = {}
+
+    for index, path in enumerate(paths):
+        parent = os.path.dirname(os.path.abspath(path))
+
+        if parent not in bins:
+            bins[parent] = os.path.join(parent, f'.trash-{os.getpid()}-{next(counter)}')
+            os.mkdir(bins[parent])
+
+            moved.append(bins[parent])
+
+        try:
+            os.rename(path, os.path.join(bins[parent], f'{index}-{os.path.basename(path)}'))
+        except OSError:
+            moved.append(path)
+
+    return moved
+
+def purge(paths, workers=16):
+    start = time.time()
+    files = []
+    dirs  = []
+
+    for path in paths:
+        if os.path.isdir(path) and not os.path.islink(path):
+            # bottom-up so that directories are empty when removed
+            for root, subdirs, names in os.walk(path, topdown=False):
+                files += [os.path.join(root, name) for name in names]
+                files += [os.path.join(root, name) for name in subdirs if os.path.islink(os.path.join(root, name))]
+                dirs.append(root)
+        else:
+            files.append(path)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        freed = sum(pool.map(unlink, files))
+
+    for path in dirs:
+        try:
+            os.rmdir(path)
+        except OSError:
+            pass
+
+    logging.info(f'{"Clean":7} : {len(files)} files, {freed/1024**2:.1f} MB ({time.time()-start:.2f}s)')
+
+    return len(files), freed
+
+# size of removed file (0: already gone or not removable)
+def unlink(path):
+    try:
+        size = os.lstat(path).st_size
+        os.unlink(path)
+    except OSError:
+        return 0
+
+    return size
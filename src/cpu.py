@@ -1,31 +1,24 @@
 #!/usr/bin/env python3 
 
-import re
 import logging
 import os
 import sys
 
-from utils import syscmd
+from utils    import probe
+from topology import Topology, cpurange
 
+@probe
 def lscpu(): 
-    host  = {} 
-    numa  = []
-    lscpu = syscmd(['lscpu'])
-
-    for line in lscpu.splitlines(): 
-        if re.search('^CPU\(s\)', line): 
-            host['CPUs'] = int(line.split()[-1]) 
-        if re.search('Model name', line): 
-            host['Model'] = ' '.join(line.split()[2:])
-        if re.search('Thread\(s\)', line): 
-            host['Threads'] = line.split()[-1]
-        if re.search('^NUMA node\d+', line): 
-            numa.append(line.split()[-1])
-        if re.search('Flags', line): 
-            avx = re.findall('(avx\w*)\s+', line)
-            host['AVXs'] = ', '.join([flag.upper() for flag in avx])
-
-        host['NUMA'] = numa
+    topology = Topology()
+
+    host = {
+        'CPUs'   : len(topology.cpus),
+        'Model'  : topology.model,
+        'Sockets': topology.sockets,
+        'Threads': str(topology.threads),
+        'NUMA'   : [cpurange(topology.numa[node]) for node in topology.numa],
+        'Caches' : {name: topology.cache[name]['size'] for name in topology.cache},
+        'AVXs'   : ', '.join(topology.avx()) }
 
     return host
 
@@ -44,9 +37,13 @@ def cpu_info(host):
         numa = f'NUMA {++i}'
         logging.info(f'{numa:<7} : {host["NUMA"][i]}')
 
+    # size of one instance
+    caches = [f'{name} {size//1024}K' for name, size in host.get('Caches', {}).items()]
+
+    logging.info(f'{"Caches":<7} : {", ".join(caches)}')
     logging.info(f'{"AVXs":<7} : {host["AVXs"]}')
 
+# MemTotal in kB
+@probe
 def cpu_memory():
-    mem_kb = syscmd(['grep MemTotal /proc/meminfo']).split()[1]*1
-
-    return int(mem_kb)
+    return Topology().memory
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+
+import os
+import time
+import shutil
+import logging
+import threading
+import subprocess
+
+from concurrent.futures import ThreadPoolExecutor
+
+from prepare import remote
+
+# package and dram zones (psys and core/uncore subzones overlap them), unreadable counters are skipped
+rapl = (
+    'for zone in {root}sys/class/powercap/intel-rapl:*; do '
+        'echo $(basename $zone) $(cat $zone/name) $(cat $zone/energy_uj) $(cat $zone/max_energy_range_uj); '
+    'done 2>/dev/null' )
+
+# energy to solution of a benchmark command on all nodes: RAPL (CPU, DRAM) and nvidia-smi power draw (GPU)
+class Energy:
+    def __init__(self, root='/', launcher='ssh', interval=0.5):
+        self.root     = os.path.join(root, '')          # sysfs stand-in for offline tests
+        self.launcher = launcher
+        self.interval = interval                        # gpu power sampling period (s)
+        self.nvidia   = shutil.which('nvidia-smi')
+
+        self.nodelist = []
+        self.before   = {}
+        self.power    = {}
+        self.readers  = []
+        self.joules   = {}
+        self.elapsed  = 0
+        self.warned   = False
+
+    def start(self, nodelist, gpu=False):
+        self.nodelist = nodelist
+        self.power    = {node: {} for node in nodelist}
+        self.readers  = []
+
+        if gpu and self.nvidia:
+            for node in nodelist:
+                self.sample_gpu(node)
+
+        self.begin    = time.time()
+        self.before   = self.counters()
+
+    def stop(self):
+        after        = self.counters()
+        self.elapsed = time.time() - self.begin
+
+        for pipe, reader in self.readers:
+            pipe.terminate()
+            reader.join()
+
+        # threads cannot be deep-copied into scan workers
+        self.readers = []
+
+        # cpu and gpu joules per node, '-': not available
+        self.joules = {}
+
+        for node in self.nodelist:
+            cpu = '-'
+            gpu = '-'
+
+            zones = [zone for zone in after[node] if zone in self.before[node]]
+
+            if zones:
+                cpu = sum(delta(self.before[node][zone], after[node][zone]) for zone in zones)/10**6
+
+            if self.power[node]:
+                gpu = sum(sum(power)/len(power) for power in self.power[node].values())*self.elapsed
+
+            self.joules[node] = (cpu, gpu)
+
+        if all(cpu == '-' for cpu, gpu in self.joules.values()) and not self.warned:
+            self.warned = True
+
+            logging.warning('RAPL energy counters are not readable (root is required on recent kernels)!')
+
+    # energy_uj of package/dram zones: {node: {zone: (energy, range)}}
+    def counters(self):
+        with ThreadPoolExecutor(max_workers=min(16, len(self.nodelist)) or 1) as pool:
+            return dict(zip(self.nodelist, pool.map(self.read_rapl, self.nodelist)))
+
+    def read_rapl(self, node):
+        pipe  = subprocess.run(remote(node, rapl.format(root=self.root), self.launcher), text=True, capture_output=True)
+        zones = {}
+
+        for line in pipe.stdout.splitlines():
+            fields = line.split()
+
+            if len(fields) == 4 and (fields[1].startswith('package') or fields[1] == 'dram'):
+                zones[fields[0]] = (int(fields[2]), int(fields[3]))
+
+        return zones
+
+    # power.draw per gpu index at fixed period in background
+    def sample_gpu(self, node):
+        pipe = subprocess.Popen(
+            remote(node, f'nvidia-smi --query-gpu=index,power.draw --format=csv,noheader,nounits -lms {int(self.interval*1000)}', self.launcher),
+            text=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+        def read():
+            for line in pipe.stdout:
+                try:
+                    index, power = [field.strip() for field in line.split(',')]
+                    self.power[node].setdefault(index, []).append(float(power))
+                except ValueError:
+                    pass
+
+        reader = threading.Thread(target=read, daemon=True)
+        reader.start()
+
+        self.readers.append((pipe, reader))
+
+    # total over nodes, '-' if no node reported
+    def total(self):
+        values = [value for cpu, gpu in self.joules.values() for value in (cpu, gpu) if value != '-']
+
+        return sum(values) if values else '-'
+
+    # per node joules next to benchmark output
+    def save(self, output):
+        with open(f'{output}.energy', 'w') as fh:
+            fh.write('node,cpu(J),gpu(J),time(s)\n')
+
+            for node, (cpu, gpu) in self.joules.items():
+                fh.write(f'{node},{cpu},{gpu},{self.elapsed:.2f}\n')
+
+    def load(self, output):
+        self.joules  = {}
+        self.elapsed = 0
+
+        try:
+            with open(f'{output}.energy') as fh:
+                for line in fh.readlines()[1:]:
+                    node, cpu, gpu, elapsed = line.strip().split(',')
+
+                    self.joules[node] = tuple(value if value == '-' else float(value) for value in (cpu, gpu))
+                    self.elapsed      = float(elapsed)
+        except OSError:
+            pass
+
+# counters wrap around at max_energy_range_uj
+def delta(before, after):
+    energy = after[0] - before[0]
+
+    return energy if energy >= 0 else energy + after[1]
@@ -4,9 +4,9 @@ import os
 import logging
 import re
 
-from env   import get_module
-from utils import syscmd
+from utils import syscmd, probe
 
+@probe
 def nvidia_smi(): 
     device = {} 
 
@@ -18,6 +18,7 @@ def nvidia_smi():
 
     return device
 
+@probe
 def gpu_memory():
     memory = syscmd([[
         'nvidia-smi', 
@@ -27,6 +28,7 @@ def gpu_memory():
 
     return int(memory)
 
+@probe
 def gpu_affinity(): 
     affinity = [] 
     topology = syscmd(['nvidia-smi topo -m'])
@@ -43,6 +45,7 @@ def gpu_info(device):
     for index in device: 
         logging.info(f'{"GPU "+index:7} : {device[index][0]} {device[index][1]}')
 
+@probe
 def device_query(builddir='./'): 
     # requirement to build deviceQuery
     sample_url = [ 
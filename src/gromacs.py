@@ -5,10 +5,16 @@ import re
 import logging
 import argparse
 
-from utils   import syscmd
 from bmt_mpi import BmtMpi
+from pattern import Pattern
 
 class Gromacs(BmtMpi):
+    pattern = Pattern(
+        nstlist = r'^Changing nstlist from \d+ to (\d+)',
+        omp     = r'^Using (\d+) OpenMP threads?',
+        perf    = r'Performance:[ \t]+(\S+)',
+        time    = r'Time:[ \t]+\S+[ \t]+(\S+)' )
+
     def __init__(
         self, input='stmv.tpr', nsteps=10000, resetstep=0, nstlist=0, pin='on', 
         bonded='cpu', pme='cpu', update='cpu',
@@ -49,6 +55,8 @@ class Gromacs(BmtMpi):
             'nsteps', 'resetsteps',
             'perf(ns/day)', 'time(s)']
 
+        self.efficiency = ('perf', 1000, 'ns/day/kW')
+
         # reset step count if tunepme is turned on 
         if self.tunepme and not self.resetstep: 
             self.resetstep = int(0.9*self.nsteps)
@@ -98,17 +106,23 @@ class Gromacs(BmtMpi):
                f'g{self.mpi.gpu}-'
                f'l{self.nstlist}.log' )
         
-        for i in range(1, self.repeat+1): 
-            if self.repeat > 1: 
+        for i in self.repeats(): 
+            if self.limit() > 1: 
                 self.output = re.sub('log(\.\d+)?', f'log.{i}', self.output)
+
+            if self.resume and self.restore(i):
+                continue
             
             logging.info(f'{"Output":7} : {os.path.join(self.outdir, self.output)}')
 
-            syscmd(self.runcmd())
+            status = self.monitor(self.runcmd())
+
+            os.rename('md.log', self.output)
 
             self.parse()
+            self.annotate()
 
-            os.rename('md.log', self.output)
+            self.complete(i, status is None)
 
             # clean redundant files
             #  if os.path.exists('ener.edr'): 
@@ -144,29 +158,30 @@ class Gromacs(BmtMpi):
 
         return cmd
 
-    def parse(self):
-        perf = '-'
-        time = '-'
-
-        with open('md.log', 'r') as fh:
-            for line in fh:
-                nstlist_regex = re.search('^Changing nstlist from \d+ to (\d+)', line)
-                omp_regex     = re.search('^Using (\d+) OpenMP threads?', line) 
-                perf_regex    = re.search('Performance:', line)
-                time_regex    = re.search('Time:', line) 
-
-                if omp_regex: 
-                    omp = omp_regex.group(1)
-
-                if nstlist_regex:
-                    nstlist = nstlist_regex.group(1)
+    def param(self):
+        return ",".join(map(str, [
+            os.path.basename(self.input),
+            self.mpi.node, self.mpi.task, self.mpi.omp, self.mpi.gpu,
+            self.nstlist, self.bonded, self.nb, self.pme, self.update,
+            self.mpi.name, self.gpudirect,
+            self.nsteps, self.resetstep ]))
 
-                if perf_regex:
-                    perf = float(line.split()[1])
+    def parse(self):
+        perf    = '-'
+        time    = '-'
+        omp     = self.mpi.omp
+        nstlist = self.nstlist
+
+        for name, groups in self.pattern.parse(self.output):
+            if name == 'omp':
+                omp = groups[0]
+            if name == 'nstlist':
+                nstlist = groups[0]
+            if name == 'perf':
+                perf = float(groups[0])
+            if name == 'time':
+                time = float(groups[0])
 
-                if time_regex:
-                    time = float(line.split()[2])
-            
         key = ",".join(map(str, [
             os.path.basename(self.input), 
             self.mpi.node, self.mpi.task, omp, self.mpi.gpu, 
@@ -174,12 +189,8 @@ class Gromacs(BmtMpi):
             self.mpi.name, self.gpudirect, 
             self.nsteps, self.resetstep ]))
 
-        if not self.result[key]['perf']: 
-            self.result[key]['perf'] = [] 
-            self.result[key]['time'] = [] 
-        
-        self.result[key]['perf'].append(perf) 
-        self.result[key]['time'].append(time) 
+        self.record(key, 'perf', perf)
+        self.record(key, 'time', time)
 
     def add_argument(self):
         super().add_argument()
@@ -7,7 +7,6 @@ import argparse
 
 from gromacs import Gromacs
 from gpu import nvidia_smi, gpu_affinity
-from env import get_module
 
 class GromacsCuda(Gromacs):
     def __init__(self, **kwargs):
@@ -6,8 +6,15 @@ import argparse
 
 from bmt_mpi import BmtMpi
 from gpu     import nvidia_smi, gpu_affinity
+from pattern import Pattern
 
 class Hpcg(BmtMpi):
+    pattern = Pattern(
+        time   = r'Total Time:?[ \t]+(\S+)',
+        grid   = r'^[ \t]*(\S+)[ \t]+process grid',
+        domain = r'^[ \t]*(\S+)[ \t]+local domain',
+        perf   = r'(SpMV|SymGS|total|final)[ \t]+=[ \t]*(\S+)' )
+
     def __init__(self, grid=[256, 256, 256], time=60, **kwargs):
 
         super().__init__(**kwargs)
@@ -24,6 +31,8 @@ class Hpcg(BmtMpi):
             'node', 'task', 'omp', 'gpu', 'mpi', 'grid', 
             'SpMV(GFlops)', 'SymGS(GFlops)', 'total(GFlops)', 'final(GFlops)', 'time(s)' ]
 
+        self.efficiency = ('final', 1, 'GFLOPS/W')
+
         self.parser.description  = 'HPCG benchmark'
 
     def write_input(self):
@@ -35,46 +44,28 @@ class Hpcg(BmtMpi):
             input_fh.write(f'{" ".join(str(grid) for grid in self.grid)}\n')
             input_fh.write(f'{self.time}')
 
+    def param(self):
+        return ",".join(map(str, [self.mpi.node, self.mpi.task, self.mpi.omp, self.mpi.gpu, "x".join(map(str, self.grid)), self.time]))
+
     def parse(self): 
-        with open(self.output, 'r') as output_fh: 
-            for line in output_fh: 
-                regex_time   = re.search('Total Time', line)
-                regex_grid   = re.search('process grid', line) 
-                regex_domain = re.search('local domain', line)  
-                regex_SpMV   = re.search('SpMV\s+=', line)
-                regex_SymGS  = re.search('SymGS\s+=', line)
-                regex_total  = re.search('total\s+=', line)
-                regex_final  = re.search('final\s+=', line)
-                
-                if regex_time: 
-                    time = float(line.split()[2])
-                if regex_grid:
-                    grid = line.split()[0]
-                if regex_domain:
-                    domain = line.split()[0]
-                if regex_SpMV: 
-                    SpMV = float(line.split()[2])
-                if regex_SymGS: 
-                    SymGS = float(line.split()[2])
-                if regex_total: 
-                    total = float(line.split()[2])
-                if regex_final: 
-                    final = float(line.split()[2])
+        perf = {}
+
+        for name, groups in self.pattern.parse(self.output):
+            if name == 'time':
+                time = float(groups[0])
+            if name == 'grid':
+                grid = groups[0]
+            if name == 'domain':
+                domain = groups[0]
+            if name == 'perf':
+                perf[groups[0]] = float(groups[1])
 
         key = ",".join(map(str, [self.mpi.node, self.mpi.task, self.mpi.omp, self.mpi.gpu, grid, domain]))
 
-        if not self.result[key] ['SpMV']: 
-            self.result[key]['SpMV']  = [] 
-            self.result[key]['SymGS'] = [] 
-            self.result[key]['total'] = [] 
-            self.result[key]['final'] = [] 
-            self.result[key]['time']  = [] 
-        
-        self.result[key]['SpMV'].append(SpMV) 
-        self.result[key]['SymGS'].append(SymGS)
-        self.result[key]['total'].append(total)
-        self.result[key]['final'].append(final)
-        self.result[key]['time'].append(time)
+        for kernel in ['SpMV', 'SymGS', 'total', 'final']:
+            self.record(key, kernel, perf[kernel])
+
+        self.record(key, 'time', time)
 
     def add_argument(self): 
         super().add_argument()
@@ -5,17 +5,26 @@ import re
 import argparse
 import shutil
 import logging 
+import itertools
+import threading
 
 from math    import sqrt
 from cpu     import cpu_memory
 from bmt_mpi import BmtMpi
+from pattern import Pattern
+from tune    import successive_halving
+from utils   import autovivification
 
 class Hpl(BmtMpi): 
+    pattern = Pattern(
+        wr     = r'^(W[RC]\S+)[ \t]+(\d+)[ \t]+(\d+)[ \t]+(\d+)[ \t]+(\d+)[ \t]+(\S+)[ \t]+(\S+)',
+        status = r'(PASSED|FAILED)' )
+
     def __init__(
         self, size=[], blocksize=[192], 
         pgrid=[], qgrid=[], pmap=0, bcast=[1],  
         threshold=16.0, pfact=[0], nbmin=[2], ndiv=[2], rfact=[0], 
-        memory=[], **kwargs ):
+        memory=[], autotune=False, **kwargs ):
 
         super().__init__(**kwargs)
 
@@ -35,6 +44,20 @@ class Hpl(BmtMpi):
         self.bcast     = bcast 
 
         self.memory    = memory 
+        self.autotune  = autotune
+
+        # suffix of output file (tuning probes)
+        self.tag       = ''
+
+        # scan parameters that fit in a single HPL.dat (see batch)
+        self.batchable = ['size', 'blocksize', 'pgrid', 'qgrid', 'bcast', 'pfact', 'nbmin', 'ndiv', 'rfact']
+
+        # WR config echoes BCAST/RFACT/NDIV/PFACT/NBMIN (see attribute)
+        self.algorithm = True
+
+        # N of tuning probes relative to full problem size
+        self.budgets   = [1/16, 1/8, 1/4, 1/2]
+        self.eta       = 3
 
         self.input     = 'HPL.dat'
         self.output    = ''
@@ -44,6 +67,9 @@ class Hpl(BmtMpi):
             'n', 'nb', 'p', 'q', 'bcast', 
             'rfact', 'ndiv', 'pfact', 'nbmin', 
             'status', 'perf(TFLOPS)', 'time(s)']
+
+        # TFLOPS -> GFLOPS/W
+        self.efficiency = ('gflops', 1000, 'GFLOPS/W')
         
         self.depth     = [1]  
         self.swap      = 1 
@@ -127,6 +153,10 @@ class Hpl(BmtMpi):
         shutil.copy(self.input, f'HPL-n{self.mpi.node}-g{self.mpi.task}-t{self.mpi.omp}.dat')
 
     def run(self): 
+        # search for best HPL.dat before the measurement
+        if self.autotune:
+            self.tune()
+
         # default matrix size
         if not self.size: 
             self.opt_matrix_size() 
@@ -140,7 +170,7 @@ class Hpl(BmtMpi):
         self.write_input()
         self.mpi.write_hostfile()
         
-        self.output = f'HPL-n{self.mpi.node}-t{self.mpi.task}-o{self.mpi.omp}-g{self.mpi.gpu}.out'
+        self.output = f'HPL-n{self.mpi.node}-t{self.mpi.task}-o{self.mpi.omp}-g{self.mpi.gpu}{self.tag}.out'
         
         super().run(1)
 
@@ -149,40 +179,240 @@ class Hpl(BmtMpi):
 
         return cmd
 
+    # results are logged as xhpl writes them: a batch of N/NB/PxQ runs for hours
+    def monitor(self, cmd, output=None):
+        if not output or self.transient:
+            return super().monitor(cmd, output)
+
+        done     = threading.Event()
+        follower = threading.Thread(target=self.progress, args=(output, done), daemon=True)
+        follower.start()
+
+        try:
+            return super().monitor(cmd, output)
+        finally:
+            done.set()
+            follower.join()
+
+    def progress(self, output, done):
+        for name, groups in self.pattern.follow(output, done.is_set):
+            if name == 'wr':
+                config, size, blocksize, p, q, time, gflops = groups
+
+                logging.info(f'{"WR":7} : {config} N={size} NB={blocksize} {p}x{q} {float(gflops)/1000:.2f} TFLOPS {time}s')
+
+    def param(self):
+        return ",".join(map(str, [
+            self.mpi.node, self.mpi.task, self.mpi.omp, self.mpi.gpu,
+            self.size, self.blocksize,
+            self.pgrid, self.qgrid, self.bcast,
+            self.rfact, self.ndiv, self.pfact, self.nbmin ]))
+
     def parse(self): 
-        with open(self.output, 'r') as output_fh:
-            line = output_fh.readline()
-
-            while line:
-                if re.search('W[RC]', line):
-                    config, size, blocksize, p, q, time, gflops = line.split()
-
-                    # passed/failed status
-                    while True: 
-                        status = output_fh.readline()
-                        if re.search('(PASSED|FAILED)', status): 
-                            status = status.split()[-1]
-                            break
-
-                    # split config into string, the first character has no meaning 
-                    mu, ordering, depth, bcast, rfact, ndiv, pfact, nbmin = list(config)
-                    
-                    # hash key 
-                    key = ",".join(map(str, [
-                        self.mpi.node, self.mpi.task, self.mpi.omp, self.mpi.gpu, 
-                        size, blocksize, 
-                        p, q, bcast, 
-                        rfact, ndiv, pfact, nbmin, status]))
-                    
-                    # hash initialization
-                    if not self.result[key]['gflops']: 
-                        self.result[key]['gflops'] = [] 
-                        self.result[key]['time']   = [] 
-
-                    self.result[key]['gflops'].append(float(gflops)/1000) 
-                    self.result[key]['time' ].append( float(time)) 
-
-                line = output_fh.readline()
+        wr = None
+
+        for name, groups in self.pattern.parse(self.output):
+            if name == 'wr':
+                wr = groups
+
+            # passed/failed status following WR line
+            if name == 'status' and wr:
+                config, size, blocksize, p, q, time, gflops = wr
+                status, wr = groups[0], None
+
+                # split config into string, the first character has no meaning 
+                mu, ordering, depth, bcast, rfact, ndiv, pfact, nbmin = list(config)
+
+                # hash key 
+                key = ",".join(map(str, [
+                    self.mpi.node, self.mpi.task, self.mpi.omp, self.mpi.gpu, 
+                    size, blocksize, 
+                    p, q, bcast, 
+                    rfact, ndiv, pfact, nbmin, status]))
+
+                self.record(key, 'gflops', float(gflops)/1000)
+                self.record(key, 'time'  , float(time))
+
+    # successive halving with reduced-N probes: NB and PxQ first, then BCAST and PFACT of the best of them
+    def tune(self):
+        if not self.size:
+            self.opt_matrix_size()
+
+        size = max(self.size)
+
+        # probes are kept out of summary, store and settle, and do not repeat
+        saved     = (self.result, self.repeat, self.ci, self.autotune, self.transient)
+        setting   = [list(getattr(self, dim)) for dim in ['blocksize', 'pgrid', 'qgrid', 'bcast', 'pfact']]
+        self.rung = 0
+
+        self.repeat, self.ci, self.autotune, self.transient = 1, 0, False, True
+
+        best = self.search([
+            {'blocksize': nb, 'grid': grid, 'bcast': self.bcast[0], 'pfact': self.pfact[0]}
+                for nb in self.tune_blocksize() for grid in self.tune_grid()], size)
+
+        # HPL-NVIDIA ignores BCAST and PFACT
+        if best and self.algorithm:
+            best = self.search([
+                dict(best, bcast=bcast, pfact=pfact)
+                    for bcast in (self.bcast if len(self.bcast) > 1 else range(6))
+                    for pfact in (self.pfact if len(self.pfact) > 1 else range(3))], size) or best
+
+        self.result, self.repeat, self.ci, self.autotune, self.transient = saved
+        self.size = [size]
+
+        if not best:
+            self.blocksize, self.pgrid, self.qgrid, self.bcast, self.pfact = setting
+
+            logging.error(f'{"Tune":7} : all HPL probes failed')
+            return
+
+        self.size      = [size]
+        self.blocksize = [best['blocksize']]
+        self.pgrid     = [best['grid'][0]]
+        self.qgrid     = [best['grid'][1]]
+        self.bcast     = [best['bcast']]
+        self.pfact     = [best['pfact']]
+
+        os.chdir(self.outdir)
+        self.write_input()
+        shutil.copy(self.input, 'HPL-tuned.dat')
+
+        logging.info(f'{"Tune":7} : {os.path.join(self.outdir, "HPL-tuned.dat")}')
+
+    # best candidate of one successive halving (None: all failed)
+    def search(self, candidates, size):
+        ranked = successive_halving(
+            candidates, lambda candidates, budget: self.probe(candidates, int(budget*size)), self.budgets, self.eta)
+
+        return ranked[0][1] if ranked else None
+
+    # GFLOPS of candidates at problem size n (None: failed)
+    def probe(self, candidates, size):
+        self.result = autovivification()
+
+        points  = [dict(candidate, size=size) for candidate in candidates]
+        results = self.batch(points, f'-tune{self.rung}.')
+
+        self.rung  += 1
+
+        return [self.best(result) for result in results]
+
+    # best passed performance of a scan point
+    def best(self, result):
+        metric = 'gflops_mixed' if getattr(self, 'ai', False) else 'gflops'
+        perf   = [max(result[key][metric]) for key in result if key.endswith('PASSED')]
+
+        return max(perf) if perf else None
+
+    # run scan points with as few xhpl invocations as possible
+    def batch(self, points, tag='-batch'):
+        points  = [self.point(point) for point in points]
+        results = [None] * len(points)
+        tuning  = self.autotune
+
+        # points are already explicit
+        self.autotune = False
+
+        for index, (resource, lists, members) in enumerate(plan(points)):
+            for opt in resource:
+                setattr(self.mpi, opt, resource[opt])
+
+            self.size      = lists['size']
+            self.blocksize = lists['blocksize']
+            self.pgrid     = [p for p, q in lists['grid']]
+            self.qgrid     = [q for p, q in lists['grid']]
+            self.bcast     = lists['bcast']
+            self.pfact     = lists['pfact']
+            self.nbmin     = lists['nbmin']
+            self.ndiv      = lists['ndiv']
+            self.rfact     = lists['rfact']
+            self.tag       = f'{tag}{index}'
+
+            logging.info(f'{"Batch":7} : {len(members)} points in {self.tag}')
+
+            self.run()
+
+            # fan out WR lines to scan points
+            for member in members:
+                results[member] = self.attribute(points[member])
+
+        self.tag      = ''
+        self.autotune = tuning
+
+        return results
+
+    # scan point with defaults from current settings
+    def point(self, point):
+        default = {
+            'node'     : self.mpi.node,
+            'task'     : self.mpi.task,
+            'omp'      : self.mpi.omp,
+            'gpu'      : self.mpi.gpu,
+            'size'     : self.size[0] if self.size else None,
+            'blocksize': self.blocksize[0],
+            'grid'     : (self.pgrid[0], self.qgrid[0]) if self.pgrid and self.qgrid else None,
+            'bcast'    : self.bcast[0],
+            'pfact'    : self.pfact[0],
+            'nbmin'    : self.nbmin[0],
+            'ndiv'     : self.ndiv[0],
+            'rfact'    : self.rfact[0] }
+
+        # pgrid/qgrid pair of a scan configuration
+        point = dict(point)
+
+        if 'pgrid' in point or 'qgrid' in point:
+            point['grid'] = (point.pop('pgrid', None), point.pop('qgrid', None))
+
+            if None in point['grid']:
+                del point['grid']
+
+        default.update(point)
+
+        # the problem size and grid of a point must be explicit in a batch
+        if default['size'] is None:
+            self.opt_matrix_size()
+            default['size'] = self.size[0]
+
+        if default['grid'] is None:
+            self.opt_mpi_grid()
+            default['grid'] = (self.pgrid[0], self.qgrid[0])
+
+        return default
+
+    # results whose key matches the scan point, regardless of status
+    def attribute(self, point):
+        fields = [
+            point['node'], point['task'], point['omp'], point['gpu'],
+            point['size'], point['blocksize'],
+            point['grid'][0], point['grid'][1] ]
+
+        if self.algorithm:
+            fields += [
+                point['bcast'], 'LCR'[int(point['rfact'])], point['ndiv'], 'LCR'[int(point['pfact'])], point['nbmin'] ]
+
+        prefix = list(map(str, fields))
+
+        return {key: self.result[key] for key in self.result if key.split(',')[0:len(prefix)] == prefix}
+
+    # block sizes around the default
+    def tune_blocksize(self):
+        if len(self.blocksize) > 1:
+            return self.blocksize
+
+        nb = int(self.blocksize[0])
+
+        return sorted(set([max(32, 32*round(nb*scale/32)) for scale in [0.5, 0.75, 1, 1.5, 2]]))
+
+    # near-square factorizations of the number of ranks with P <= Q (Q/P <= 4), the squarest one otherwise
+    def tune_grid(self):
+        if len(self.pgrid) > 1:
+            return list(zip(self.pgrid, self.qgrid))
+
+        ranks = int(self.mpi.node) * int(self.mpi.task)
+        grids = [(p, ranks//p) for p in range(1, int(sqrt(ranks))+1) if ranks % p == 0]
+
+        return [(p, q) for p, q in grids if q <= 4*p] or grids[-1:]
 
     def opt_mpi_grid(self): 
         self.pgrid = [] 
@@ -243,6 +473,7 @@ class Hpl(BmtMpi):
         self.parser.add_argument('--pmap'     , type=int             , help='MPI process mapping (default: row-major)')
         self.parser.add_argument('--threshold', type=float           , help='swapping threshold (default: 16.0)')
         self.parser.add_argument('--memory'   , type=str  , nargs='*', help='list of memory usages (default: none)')
+        self.parser.add_argument('--autotune' , action='store_true' , help='search NB, PxQ, BCAST and PFACT with reduced-N probes')
 
     # total number of devices 
     def total_device(self): 
@@ -251,3 +482,44 @@ class Hpl(BmtMpi):
     # total memory in Byte
     def total_memory(self): 
         return self.total_device()*cpu_memory()*1000
+
+# HPL.dat parameters, each line is a list of values
+dims      = ['size', 'blocksize', 'grid', 'pfact', 'nbmin', 'ndiv', 'rfact', 'bcast']
+resources = ['node', 'task', 'omp', 'gpu']
+
+# group scan points into batches: one HPL.dat whose cartesian product of
+# values is exactly the set of points in the batch
+def plan(points):
+    groups  = {}
+    batches = []
+
+    # points sharing node/task/omp/gpu
+    for index, point in enumerate(points):
+        groups.setdefault(tuple(point[opt] for opt in resources), []).append(index)
+
+    for resource, members in groups.items():
+        batches += split(points, members, dict(zip(resources, resource)))
+
+    return batches
+
+def split(points, members, resource):
+    lists = {}
+
+    for dim in dims:
+        lists[dim] = list(dict.fromkeys(points[member][dim] for member in members))
+
+    unique  = set(tuple(points[member][dim] for dim in dims) for member in members)
+    product = set(itertools.product(*[lists[dim] for dim in dims]))
+
+    if unique == product:
+        return [(resource, lists, members)]
+
+    # split on the dimension with fewest values and try again
+    dim     = min([dim for dim in dims if len(lists[dim]) > 1], key=lambda dim: len(lists[dim]))
+    batches = []
+
+    for value in lists[dim]:
+        batches += split(points, [member for member in members if points[member][dim] == value], resource)
+
+    return batches
+
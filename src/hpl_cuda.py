@@ -5,10 +5,16 @@ import re
 import argparse
 
 from hpl  import Hpl
-from gpu  import nvidia_smi, gpu_affinity, gpu_memory
-from math import sqrt
+from gpu     import nvidia_smi, gpu_affinity, gpu_memory
+from math    import sqrt
+from pattern import Pattern
 
 class HplCuda(Hpl): 
+    # HPL-AI
+    pattern_ai = Pattern(
+        wr     = r'^(\S+)[ \t]+(W[RC]\S+)' + r'[ \t]+(\S+)'*9,
+        status = r'(PASSED|FAILED)' )
+
     def __init__(self, ai=False, **kwargs):
         super().__init__(**kwargs)
 
@@ -31,6 +37,10 @@ class HplCuda(Hpl):
         self.blocksize = [288]
         self.l1        = 1
 
+        # HPL-NVIDIA echoes a constant WR00C4C4: only N, NB and PxQ tell rows apart
+        self.algorithm = False
+        self.batchable = ['size', 'blocksize', 'pgrid', 'qgrid']
+
         # HPL-AI 
         self.parser.description  = 'HPL Benchmark (NVIDIA)'
 
@@ -39,21 +49,27 @@ class HplCuda(Hpl):
         self.check_prerequisite('connectx', '4'     )
         self.check_prerequisite('nvidia'  , '450.36')
 
-        if self.sif: 
+        if self.sif and not self.name.endswith('/NGC'): 
             self.name += '/NGC'
 
+        # HPL-AI reports mixed-precision instead of FP64 performance
+        self.efficiency = ('gflops_mixed' if self.ai else 'gflops', 1000, 'GFLOPS/W')
+
         super().run()
 
     def execmd(self): 
         if self.sif:
             self.bin   = 'hpl.sh'
 
+        # NUMA affinity of the visible GPUs (physical index), GPU affinity is relative to CUDA_VISIBLE_DEVICES
+        numa = [gpu_affinity()[int(i)] for i in self.mpi.cuda_devs[0:self.mpi.gpu]]
+
         cmd = [ 
             self.bin,
                f'--dat {self.input}', 
                f'--cpu-cores-per-rank {self.mpi.omp}',  
-               f'--cpu-affinity {":".join(gpu_affinity()[0:self.mpi.gpu])}', 
-               f'--mem-affinity {":".join(gpu_affinity()[0:self.mpi.gpu])}', 
+               f'--cpu-affinity {":".join(numa)}', 
+               f'--mem-affinity {":".join(numa)}', 
                f'--gpu-affinity {":".join([str(i) for i in range(0, self.mpi.gpu)])}' ]
         
         # ucx transport (2021.4) 
@@ -67,6 +83,9 @@ class HplCuda(Hpl):
 
         return cmd
 
+    def param(self):
+        return f'{super().param()},{self.ai}'
+
     def parse(self): 
         # HPL-AI
         if self.ai:
@@ -77,41 +96,30 @@ class HplCuda(Hpl):
                 'rfact', 'ndiv', 'pfact', 'nbmin', 
                 'status', 'perf(TFLOPS)', 'perf_irs(TFLOPS)','time(s)']
 
-            with open(self.output, 'r') as output_fh:
-                line = output_fh.readline()
-
-                while line:
-                    if re.search('W[RC]', line):
-                        ai, config, size, blocksize, p, q, time, gflops_half, refine, niter, gflops_mixed = line.split()
-
-                        # passed/failed status
-                        while True:
-                            status = output_fh.readline()
-                            if re.search('(PASSED|FAILED)', status):
-                                status = status.split()[-1]
-                                break
-
-                        # split config into string, the first character has no meaning
-                        mu, ordering, depth, bcast, rfact, ndiv, pfact, nbmin = list(config)
-
-                        # hash key
-                        key = ",".join(
-                            map(str, [
-                                self.mpi.node, self.mpi.task, self.mpi.omp, self.mpi.gpu, 
-                                size, blocksize, p, q, bcast,
-                                rfact, ndiv, pfact, nbmin, status]))
-
-                        # hash initialization
-                        if not self.result[key]['gflops_half']:
-                            self.result[key]['gflops_half']  = []
-                            self.result[key]['gflops_mixed'] = []
-                            self.result[key]['time']         = []
-
-                        self.result[key]['gflops_half'].append(float(gflops_half)/1000)
-                        self.result[key]['gflops_mixed'].append(float(gflops_mixed)/1000)
-                        self.result[key]['time' ].append( float(time))
-
-                    line = output_fh.readline()
+            wr = None
+
+            for name, groups in self.pattern_ai.parse(self.output):
+                if name == 'wr':
+                    wr = groups
+
+                # passed/failed status following WR line
+                if name == 'status' and wr:
+                    ai, config, size, blocksize, p, q, time, gflops_half, refine, niter, gflops_mixed = wr
+                    status, wr = groups[0], None
+
+                    # split config into string, the first character has no meaning
+                    mu, ordering, depth, bcast, rfact, ndiv, pfact, nbmin = list(config)
+
+                    # hash key
+                    key = ",".join(
+                        map(str, [
+                            self.mpi.node, self.mpi.task, self.mpi.omp, self.mpi.gpu, 
+                            size, blocksize, p, q, bcast,
+                            rfact, ndiv, pfact, nbmin, status]))
+
+                    self.record(key, 'gflops_half' , float(gflops_half)/1000)
+                    self.record(key, 'gflops_mixed', float(gflops_mixed)/1000)
+                    self.record(key, 'time'        , float(time))
         else: 
             super().parse()
 
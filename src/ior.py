@@ -2,14 +2,29 @@
 
 import os
 import re
+import json
+import logging
 import argparse
+import subprocess
 
-from glob    import glob
-from utils   import sync
 from bmt_mpi import BmtMpi
+from cleanup import remove
+from prepare import prepare, command
+from pattern import Pattern
+from tune    import successive_halving
+from utils   import autovivification
 
 class Ior(BmtMpi):
-    def __init__(self, transfer='4M', block='64M', segment=16, ltrsize=0, ltrcount=0, **kwargs): 
+    pattern = Pattern(
+        size      = r'aggregate filesize[ \t]*=[ \t]*(\S+)[ \t]+(\S)',
+        stonewall = r'stonewalling pairs accessed min: (\d+) max: (\d+) -- min data: (\S+) GiB mean data: (\S+) GiB time: ([\d.]+)s',
+        access    = r'^(write|read)[ \t]+\d' )
+
+    def __init__(
+        self, transfer='4M', block='64M', segment=16, ltrsize=0, ltrcount=0, cache=None, 
+        api='POSIX', layout='N-N', order='random', collective=False, 
+        iteration=1, stonewall=0, autotune=False, **kwargs): 
+
         super().__init__(**kwargs)
         
         self.name     = 'IOR'
@@ -21,9 +36,40 @@ class Ior(BmtMpi):
         self.ltrsize  = ltrsize
         self.ltrcount = ltrcount
 
+        # access pattern: backend (-a), N-N/N-1 (-F), seq/random offsets (-z), collective I/O (-c)
+        self.api        = api
+        self.layout     = layout
+        self.order      = order
+        self.collective = collective
+
+        # repetitions within one IOR run (-i), deadline for each phase (-D)
+        self.iteration = iteration
+        self.stonewall = stonewall
+
+        # striping search: candidates and stonewall deadlines (s) of successive rungs
+        self.autotune      = autotune
+        self.tune_count    = [1, 2, 4, 8, -1]
+        self.tune_size     = [1048576, 4194304, 16777216]
+        self.tune_transfer = []
+        self.tune_block    = []
+        self.budgets       = [2, 5, 10, 30]
+        self.eta           = 3
+        self.tag           = ''
+
+        # I/O backends compiled into ior (None: not probed yet)
+        self.apis          = None
+
+        # cold-cache reads: drop (root), fadvise, direct or reorder
+        self.cache    = cache or ('drop' if os.getuid() == 0 else 'fadvise')
+        self.phase    = '-w -r'
+        self.cycle    = ''
+
         self.src      = ['https://github.com/hpc/ior/releases/download/3.3.0/ior-3.3.0.tar.gz -O {self.builddir}/ior-3.3.0.tar.gz']
         
-        self.header   = ['node', 'ntask', 'transfer', 'block', 'segment', 'size', 'write(MB/s)', 'read(MB/s)', 'write(OPS)', 'read(OPS)']
+        self.header   = [
+            'node', 'ntask', 'transfer', 'block', 'segment', 
+            'api', 'layout', 'order', 'collective', 
+            'ltrcount', 'ltrsize', 'cache', 'size', 'write(MB/s)', 'read(MB/s)', 'write(OPS)', 'read(OPS)']
         
         self.parser.description = 'IOR Benchmark'
 
@@ -33,26 +79,64 @@ class Ior(BmtMpi):
         
         self.check_prerequisite('openmpi', '3')
 
+        include  = [f'-I{os.environ["MPI_ROOT"]}/include']
+        library  = [f'-L{os.environ["MPI_ROOT"]}/lib']
+        backends = []
+
+        # HDF5 and PnetCDF backends are built when their installation is known
+        for api, option, root in [('HDF5', '--with-hdf5', 'HDF5_ROOT'), ('NCMPI', '--with-ncmpi', 'PNETCDF_ROOT')]:
+            if os.environ.get(root):
+                backends.append(option)
+                include.append(f'-I{os.environ[root]}/include')
+                library.append(f'-L{os.environ[root]}/lib')
+            elif self.api == api:
+                logging.warning(f'{api} backend requires {root}, ior is built without it!')
+
         self.buildcmd = [
             [f'cd {self.builddir}', 'tar xf ior-3.3.0.tar.gz'],  
             [f'cd {self.builddir}/ior-3.3.0', 
                ['./configure', 
                    f'--prefix={os.path.abspath(self.prefix)}', 
+                    *backends,
                     'MPICC=mpicc',  
-                    f'CPPFLAGS=-I{os.environ["MPI_ROOT"]}/include', 
-                    f'LDFLAGS=-L{os.environ["MPI_ROOT"]}/lib'],  
+                    f'CPPFLAGS="{" ".join(include)}"', 
+                    f'LDFLAGS="{" ".join(library)}"'],  
                 'make -j 8',  
                 'make install' ]]
 
         super().build()
 
     def run(self): 
+        if self.api not in self.backends(): 
+            logging.error(f'{self.api} backend is not built into {self.bin}')
+            return
+
+        # search for best striping before the measurement 
+        if self.autotune: 
+            self.tune()
+
         os.chdir(self.outdir)
 
         self.mpi.write_hostfile() 
 
-        # flush cache 
-        sync(self.nodelist)
+        # flush cache and remove leftover files on all nodes
+        if self.cache == 'drop': 
+            prepare(self.nodelist, ['clean', 'sync', 'drop', 'compact'], [os.path.join(self.outdir, 'testFile*')])
+        else: 
+            prepare(self.nodelist, ['clean'], [os.path.join(self.outdir, 'testFile*')])
+
+        if self.cache == 'reorder' and int(self.mpi.node) == 1: 
+            logging.warning('Reordering tasks requires more than one node!')
+
+        if self.collective and self.api not in collective_api: 
+            logging.warning(f'Collective I/O is not supported by {self.api}!')
+
+        if self.cache == 'direct' and self.api != 'POSIX': 
+            logging.warning(f'Direct I/O is not supported by {self.api}!')
+
+        # warned once by tune() for probes
+        if (self.ltrsize or self.ltrcount) and not self.lustre() and not self.tag: 
+            logging.warning(f'Lustre striping is ignored on {fstype(self.outdir)}!')
         
         self.output = (
             'ior-'
@@ -60,11 +144,61 @@ class Ior(BmtMpi):
                 f'p{self.mpi.task}-'
                 f't{self.transfer}-'
                 f'b{self.block}-'
-                f's{self.segment}.out' )
+                f's{self.segment}-'
+                f'{self.api.lower()}-'
+                f'{self.layout.replace("-", "")}-'
+                f'{self.order}{"-coll" if self.is_collective() else ""}-'
+                f'c{self.ltrcount}-'
+                f'S{self.ltrsize}{self.tag}.out' )
+
+        # page cache is evicted between commands only, so that every read of -i N is cold
+        if len(self.cycles()) > 1: 
+            logging.info(f'{"Cache":7} : {self.iteration} iterations as separate write/read runs with {"+".join(self.eviction())} in between')
 
         super().run(1)
             
         self.clean() 
+
+    def runcmd(self): 
+        if not self.eviction(): 
+            return super().runcmd()
+
+        cmd       = []
+        cycles    = self.cycles()
+        iteration = self.iteration
+
+        # write and read in separate runs of one iteration each, test files are evicted from page cache in between 
+        for self.cycle in cycles: 
+            self.iteration = 1
+
+            self.phase = '-w'
+            write      = super().runcmd()
+        
+            self.phase = '-r'
+            read       = super().runcmd()
+
+            cmd += write + [command(self.nodelist[0:int(self.mpi.node)], self.eviction(), [os.path.join(self.outdir, 'testFile*')])] + read
+
+        self.phase, self.cycle, self.iteration = '-w -r', '', iteration
+
+        return cmd
+
+    # summary suffix of each iteration run separately for eviction ('': single IOR run) 
+    def cycles(self): 
+        if self.eviction() and int(self.iteration) > 1: 
+            return [f'.{i}' for i in range(1, int(self.iteration)+1)]
+
+        return ['']
+
+    # prepare actions that evict test files from page cache between write and read 
+    def eviction(self): 
+        if self.cache == 'drop' and os.getuid() == 0: 
+            return ['sync', 'drop']
+
+        if self.cache == 'fadvise': 
+            return ['evict']
+
+        return []
    
     def execmd(self): 
         cmd = [
@@ -72,72 +206,282 @@ class Ior(BmtMpi):
                f'-t {self.transfer}',  
                f'-b {self.block}',  
                f'-s {self.segment}', 
+               f'-a {self.api}',    # I/O backend
                 " ".join([
-                '-w',               # write benchmark
-                '-r',               # read benchmark
+                self.phase,         # write/read benchmark
                 '-k',               # do not remove files
-                '-z',               # random access to file 
                 '-e',               # fsync upon write close
-                '-F',               # N-to-N 
                 '-C' ])]            # reorderTasks
+
+        # N-to-N (default: N-to-1)
+        if self.layout == 'N-N': 
+            cmd.append('-F')
+
+        # random access to file 
+        if self.order == 'random': 
+            cmd.append('-z')
+
+        # collective MPI-IO 
+        if self.is_collective(): 
+            cmd.append('-c')
+
+        # repetitions 
+        cmd.append(f'-i {self.iteration}')
+
+        # stonewalling
+        if self.stonewall: 
+            cmd.append(f'-D {self.stonewall}')
+
+        # bypass page cache 
+        if self.cache == 'direct' and self.api == 'POSIX': 
+            cmd.append('--posix.odirect')
         
+        # JSON summary with per-iteration results
+        options = ['summaryFormat=JSON', f'summaryFile={self.summary_file()}']
+
         # lustre directives 
-        lustre = [] 
-        if self.ltrsize: 
-            lustre.append(f'lustreStripeSize={self.ltrsize}')
-        if self.ltrcount: 
-            lustre.append(f'lustreStripeCount={self.ltrcount}')
+        if self.ltrsize and self.lustre(): 
+            options.append(f'lustreStripeSize={self.ltrsize}')
+        if self.ltrcount and self.lustre(): 
+            options.append(f'lustreStripeCount={self.ltrcount}')
 
-        if lustre:
-            cmd += [f'-O "{",".join(lustre)}"']
+        cmd += [f'-O "{",".join(options)}"']
 
         return cmd
 
+    # JSON summary of each phase
+    def summary_file(self, phase=None):
+        suffix = {'-w': '.write', '-r': '.read'}.get(phase or self.phase, '')
+
+        return f'{self.output}{suffix}{self.cycle}.json'
+
+    # -a S  api -- API for I/O [POSIX|DUMMY|MPIIO|MMAP], every backend is assumed when help cannot be read (container)
+    def backends(self): 
+        if self.apis is None: 
+            self.apis = ['POSIX', 'MPIIO', 'HDF5', 'NCMPI']
+
+            if not self.sif and os.path.exists(self.bin): 
+                pipe  = subprocess.run([self.bin, '-h'], text=True, capture_output=True)
+                match = re.search(r'API for I/O \[([^\]]+)\]', pipe.stdout)
+
+                if match: 
+                    self.apis = match.group(1).split('|')
+
+        return self.apis
+
+    def param(self):
+        return ",".join(map(str, [
+            self.mpi.node, self.mpi.task, self.transfer, self.block, self.segment, 
+            self.api, self.layout, self.order, self.is_collective(), 
+            self.ltrcount, self.ltrsize, self.method()]))
+
+    def is_collective(self): 
+        return bool(self.collective) and self.api in collective_api
+
+    # striping hints are only understood by lustre 
+    def lustre(self): 
+        return fstype(self.outdir) == 'lustre'
+
+    # cache-control methods in effect, recorded with results
+    def method(self): 
+        method = [] 
+
+        if self.cache == 'fadvise' or self.cache == 'drop' and os.getuid() == 0: 
+            method.append(self.cache)
+
+        # O_DIRECT (POSIX backend only)
+        if self.cache == 'direct' and self.api == 'POSIX': 
+            method.append(self.cache)
+
+        # -C: read back by tasks on the neighbouring node 
+        if int(self.mpi.node) > 1: 
+            method.append('reorder')
+
+        return '+'.join(method) or 'none'
+
     def parse(self): 
-        key   = ",".join(map(str, [self.mpi.node, self.mpi.task, self.transfer, self.block, self.segment]))
-
-        write = [] 
-        read  = [] 
-
-        with open(self.output, 'r') as output_fh:
-            line = output_fh.readline() 
-
-            while line: 
-                # append total size to key 
-                if re.search('aggregate filesize', line): 
-                    size, unit = line.split()[-2:] 
-                    size  = f'{size}{unit[0]}'
-                    key  += f',{size}'
-                    # size = f'{size}{unit[0].lower()}'
-
-                if re.search('Summary', line): 
-                    output_fh.readline() 
-                    write = output_fh.readline().split()
-                    read  = output_fh.readline().split()
-                    exit
-
-                line = output_fh.readline() 
-
-        if not self.result[key]['write']: 
-            self.result[key]['write']        = [] 
-            self.result[key]['read']         = [] 
-            self.result[key]['random_write'] = [] 
-            self.result[key]['random_read']  = [] 
-    
-        self.result[key]['write'].append(float(write[3]))
-        self.result[key]['read' ].append(float(read[3]))
-        self.result[key]['random_write'].append(float(write[7]))
-        self.result[key]['random_read' ].append(float(read[7]))
+        size      = ''
+        stonewall = [] 
+        corrected = {'write': [], 'read': []}
+        
+        for name, groups in self.pattern.parse(self.output):
+            # total size (printed by both phases with fadvise) 
+            if name == 'size':
+                size = ''.join(groups)
+
+            # data moved by all ranks before the deadline
+            if name == 'stonewall':
+                stonewall.append(1024*float(groups[2])/float(groups[4]))
+
+            # stonewalling line precedes the result row of the phase
+            if name == 'access' and stonewall:
+                corrected[groups[0]].append(stonewall.pop())
+        
+        # per-iteration results of each phase
+        results = []
+
+        for self.cycle in self.cycles():
+            for phase in ['-w -r', '-w', '-r']:
+                if os.path.exists(self.summary_file(phase)):
+                    with open(self.summary_file(phase)) as fh:
+                        summary = json.load(fh)
+
+                    for test in summary['tests']:
+                        for iteration in test['Results']:
+                            results += iteration
+
+                    # aggregate size from summary when text output is reduced
+                    if not size and summary.get('summary'):
+                        size = f'{summary["summary"][0].get("xsizeMiB", 0)/1024:g}G'
+
+        self.cycle = ''
+
+        # append total size to key 
+        key = f'{self.param()},{size}'
+
+        for metric, access, field in [
+            ('write', 'write', 'bwMiB'), ('read', 'read', 'bwMiB'), 
+            ('random_write', 'write', 'iops'), ('random_read', 'read', 'iops')]: 
+
+            samples = [result[field] for result in results if result['access'] == access]
+
+            for sample in samples or ['-']:
+                self.record(key, metric, sample)
+
+        # timings are kept in store only
+        for access in ['write', 'read']:
+            samples = [result for result in results if result['access'] == access]
+
+            for index, result in enumerate(samples, len(self.result[key][access]) - len(samples) + 1):
+                for field in ['openTime', 'wrRdTime', 'closeTime', 'totalTime', 'latency']:
+                    self.archive(key, f'{access}_{field}', result.get(field, '-'), index)
+
+            for index, bandwidth in enumerate(corrected[access], len(self.result[key][access]) - len(corrected[access]) + 1):
+                self.archive(key, f'{access}_stonewall', bandwidth, index)
+
+    # successive halving over stripe count/size and transfer/block size with stonewalled probes
+    def tune(self): 
+        candidates = [] 
+
+        for count in self.tune_count: 
+            for size in self.tune_size: 
+                for transfer in (self.tune_transfer or [self.transfer]): 
+                    for block in (self.tune_block or [self.block]): 
+                        # block must be a multiple of transfer
+                        if nbytes(block) % nbytes(transfer) == 0: 
+                            candidates.append({'ltrcount': count, 'ltrsize': size, 'transfer': transfer, 'block': block})
+
+        # local filesystem stand-in: search logic only
+        if not self.lustre(): 
+            logging.warning(f'Lustre striping is ignored on {fstype(self.outdir)}!')
+
+        # probes are kept out of summary, store and settle, and do not repeat
+        saved   = (self.result, self.repeat, self.ci, self.iteration, self.stonewall, self.autotune, self.transient)
+        setting = (self.ltrcount, self.ltrsize, self.transfer, self.block)
+
+        self.repeat, self.ci, self.iteration, self.autotune, self.transient = 1, 0, 1, False, True
+
+        # write and read rankings share probes 
+        measured = {}
 
+        def evaluate(candidates, budget, access): 
+            for candidate in candidates: 
+                if (str(candidate), budget) not in measured: 
+                    measured[(str(candidate), budget)] = self.probe(candidate, budget)
+
+            return [measured[(str(candidate), budget)][access] for candidate in candidates]
+
+        best = {} 
+
+        for access in ['write', 'read']: 
+            ranked = successive_halving(
+                candidates, lambda candidates, budget: evaluate(candidates, budget, access), self.budgets, self.eta)
+
+            if ranked: 
+                best[access] = ranked[0][1]
+
+                logging.info(f'{"Tune":7} : {access} {ranked[0][0]:.2f} MB/s {ranked[0][1]}')
+
+        self.result, self.repeat, self.ci, self.iteration, self.stonewall, self.autotune, self.transient = saved
+        self.tag = ''
+        
+        # files are striped at creation: apply the best layout for write 
+        if 'write' in best: 
+            for opt in best['write']: 
+                setattr(self, opt, best['write'][opt])
+        else: 
+            self.ltrcount, self.ltrsize, self.transfer, self.block = setting
+
+            logging.error(f'{"Tune":7} : all IOR probes failed')
+
+        return best
+
+    # mean write/read bandwidth of a candidate within the deadline (None: failed) 
+    def probe(self, candidate, budget): 
+        for opt in candidate: 
+            setattr(self, opt, candidate[opt])
+
+        self.result    = autovivification()
+        self.stonewall = budget
+        self.tag       = f'-D{budget}'
+
+        self.run()
+
+        score = {'write': None, 'read': None}
+
+        for key in self.result: 
+            for access in score: 
+                samples = [sample for sample in self.result[key][access] if sample != '-']
+
+                if samples: 
+                    score[access] = sum(samples)/len(samples)
+
+        return score
+
+    # test files are deleted while the next configuration runs
     def clean(self): 
-        for io_file in glob('testFile*'): 
-            os.remove(io_file)
+        remove([os.path.join(self.outdir, 'testFile*')], background=True)
 
     def add_argument(self): 
         super().add_argument() 
 
-        self.parser.add_argument('--transfer', type=str, help='transfer size (default: 4M)')
-        self.parser.add_argument('--block'   , type=str, help='block size (default: 64M)')
-        self.parser.add_argument('--segment' , type=int, help='number of segement (default:16)')
-        self.parser.add_argument('--ltrsize' , type=int, help='lustre stripe size (default: 0)')
-        self.parser.add_argument('--ltrcount', type=int, help='lustre stripe count (default: 0)')
+        self.parser.add_argument('--transfer'     , type=str, help='transfer size (default: 4M)')
+        self.parser.add_argument('--block'        , type=str, help='block size (default: 64M)')
+        self.parser.add_argument('--segment'      , type=int, help='number of segement (default:16)')
+        self.parser.add_argument('--ltrsize'      , type=int, help='lustre stripe size (default: 0)')
+        self.parser.add_argument('--ltrcount'     , type=int, help='lustre stripe count (default: 0)')
+        self.parser.add_argument('--api'          , type=str, choices=['POSIX', 'MPIIO', 'HDF5', 'NCMPI'], help='I/O backend (default: POSIX)')
+        self.parser.add_argument('--layout'       , type=str, choices=['N-N', 'N-1'], help='file per process or single shared file (default: N-N)')
+        self.parser.add_argument('--order'        , type=str, choices=['seq', 'random'], help='access order within file (default: random)')
+        self.parser.add_argument('--collective'   , action='store_true', help='collective MPI-IO (MPIIO, HDF5, NCMPI)')
+        self.parser.add_argument('--iteration'    , type=int, help='number of repetitions within one IOR run, run one by one with page cache eviction under drop/fadvise (default: 1)')
+        self.parser.add_argument('--stonewall'    , type=int, help='deadline for each phase in seconds (default: 0)')
+        self.parser.add_argument('--autotune'     , action='store_true', help='search stripe count/size and transfer/block size with stonewalled probes')
+        self.parser.add_argument('--tune_count'   , type=int, nargs='*', help='stripe counts to search (default: 1 2 4 8 -1)')
+        self.parser.add_argument('--tune_size'    , type=int, nargs='*', help='stripe sizes to search (default: 1M 4M 16M)')
+        self.parser.add_argument('--tune_transfer', type=str, nargs='*', help='transfer sizes to search (default: --transfer)')
+        self.parser.add_argument('--tune_block'   , type=str, nargs='*', help='block sizes to search (default: --block)')
+        self.parser.add_argument('--cache'        , type=str, choices=['drop', 'fadvise', 'direct', 'reorder'], help='cache control for read (default: drop as root, fadvise otherwise)')
+
+# backends with collective I/O
+collective_api = ['MPIIO', 'HDF5', 'NCMPI']
+
+# 4M -> 4194304
+def nbytes(size): 
+    number, unit = re.match(r'(\d+)([kKmMgG]?)', str(size)).groups()
+
+    return int(number)*1024**' KMG'.index(unit.upper() or ' ')
+
+# type of the filesystem containing path (longest matching mount point) 
+def fstype(path): 
+    path   = os.path.realpath(path)
+    mounts = [] 
+
+    with open('/proc/mounts') as fh: 
+        for line in fh: 
+            device, mount, kind = line.split()[0:3]
+
+            if path == mount or path.startswith(mount.rstrip('/') + '/'): 
+                mounts.append((len(mount), kind))
+
+    return max(mounts)[1] if mounts else ''
@@ -5,12 +5,16 @@ import os
 import argparse
 import logging
 
-from glob import glob 
-from utils import sync, syscmd
-from bmt import Bmt
+from bmt     import Bmt
+from prepare import prepare
+from cleanup import remove
+from pattern import Pattern
 
 class Iozone(Bmt):
-    def __init__(self, size='64M', record='1M', node=0, thread=0, **kwargs): 
+    pattern = Pattern(
+        children = r'Children.+?(initial|random)? (reader|writer).*?[ \t](\S+)[ \t]+\S+[ \t]*$' )
+
+    def __init__(self, size='64M', record='1M', node=0, thread=0, cache=None, **kwargs): 
         super().__init__(**kwargs)
 
         self.name   = 'IOZONE'
@@ -22,9 +26,12 @@ class Iozone(Bmt):
         self.node   = node or len(self.nodelist)
         self.thread = thread or int(os.environ['SLURM_NTASKS_PER_NODE'])
 
+        # cold-cache reads: drop (root), fadvise or direct
+        self.cache  = cache or ('drop' if os.getuid() == 0 else 'fadvise')
+
         self.src    = ['http://www.iozone.org/src/current/iozone3_491.tgz']
 
-        self.header = ['node', 'thread', 'size', 'record', 'write(MB/s)', 'read(MB/s)', 'random_write(OPS)', 'random_read(OPS)']
+        self.header = ['node', 'thread', 'size', 'record', 'cache', 'write(MB/s)', 'read(MB/s)', 'random_write(OPS)', 'random_read(OPS)']
  
         self.parser.description = 'IOZONE Benchmark'
 
@@ -57,8 +64,8 @@ class Iozone(Bmt):
         read_output   = f'iozone-i1-n{self.node}-t{self.thread}-s{self.size}-r{self.record}.out'
         random_output = f'iozone-i2-n{self.node}-t{self.thread}-s{self.size}-r{self.record}.out'
 
-        for i in range(1, self.repeat+1): 
-            if self.repeat > 1: 
+        for i in self.repeats(): 
+            if self.limit() > 1: 
                 write_output  = re.sub('out(\.\d+)?', f'out.{i}', write_output)
                 read_output   = re.sub('out(\.\d+)?', f'out.{i}', read_output)
                 random_output = re.sub('out(\.\d+)?', f'out.{i}', random_output)
@@ -73,13 +80,31 @@ class Iozone(Bmt):
         self.mode   = mode 
         self.output = output
 
-        sync(self.nodelist)
+        # repeat index from output suffix
+        repeat = int((re.findall('out\.(\d+)$', output) or [1])[0])
+
+        if self.resume and self.restore(repeat):
+            return
+
+        # flush cache on all nodes, temporary files are kept for read tests
+        if mode == 0: 
+            prepare(self.nodelist, ['clean'], [os.path.join(self.outdir, '*DUMMY*')])
+
+        if self.cache == 'drop': 
+            prepare(self.nodelist, ['sync', 'drop', 'compact'])
+
+        # evict written files from page cache before reading them back
+        if self.cache == 'fadvise' and mode > 0: 
+            prepare(self.nodelist, ['evict'], [os.path.join(self.outdir, '*DUMMY*')])
             
         logging.info(f'{"Output":7} : {os.path.join(self.outdir, self.output)}')
 
-        syscmd(self.runcmd(), output)
+        status = self.monitor(self.runcmd(), output)
 
         self.parse() 
+        self.annotate()
+
+        self.complete(repeat, status is None)
 
     def runcmd(self):
         cmd = [
@@ -91,6 +116,8 @@ class Iozone(Bmt):
         #-O: Return result in OPS
         if self.mode == 2:  
             cmd += ['-I', '-O']
+        elif self.cache == 'direct': 
+            cmd += ['-I']
 
         # generic options
         cmd += [
@@ -105,32 +132,29 @@ class Iozone(Bmt):
 
         return [cmd]
 
-    def parse(self):
-        key = ",".join(map(str, [self.node, self.thread, self.size, self.record]))
+    def param(self):
+        return ",".join(map(str, [self.node, self.thread, self.size, self.record, self.method()]))
 
-        with open(self.output, 'r') as output_fh: 
-            for line in output_fh: 
-                match = re.search('Children.+?(initial|random)? (reader|writer)', line)
+    # cache-control method in effect, recorded with results
+    def method(self): 
+        if self.cache in ['fadvise', 'direct'] or self.cache == 'drop' and os.getuid() == 0: 
+            return self.cache 
 
-                if match:
-                    (mode, io) = match.groups() 
-                    bandwidth  = line.split()[-2]
+        return 'none'
 
-                    # random I/O
-                    if mode == 'random': 
-                        if not self.result[key][f'random_{io}']: 
-                            self.result[key][f'random_{io}'] = [] 
-
-                        self.result[key][f'random_{io}'].append(float(bandwidth))
-                    else: 
-                        if not self.result[key][io]:  
-                            self.result[key][io] = [] 
+    def parse(self):
+        key = self.param()
 
-                        self.result[key][io].append(float(bandwidth)/1024)
+        for name, (mode, io, bandwidth) in self.pattern.parse(self.output):
+            # random I/O
+            if mode == 'random': 
+                self.record(key, f'random_{io}', float(bandwidth))
+            else: 
+                self.record(key, io, float(bandwidth)/1024)
 
+    # test files are deleted while the next configuration runs
     def clean(self): 
-        for io_file in sorted(glob(f'{self.outdir}/*DUMMY*')):
-            os.remove(io_file)
+        remove([os.path.join(self.outdir, '*DUMMY*')], background=True)
         
     def add_argument(self): 
         super().add_argument()
@@ -139,3 +163,4 @@ class Iozone(Bmt):
         self.parser.add_argument('--record', type=str, help='record size (default: 1M)')
         self.parser.add_argument('--node'  , type=int, help='number of node (default: $SLURM_NNODES)')
         self.parser.add_argument('--thread', type=int, help='number of threads (default: 8')
+        self.parser.add_argument('--cache' , type=str, choices=['drop', 'fadvise', 'direct'], help='cache control for read (default: drop as root, fadvise otherwise)')
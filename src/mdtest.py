@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import argparse
+
+from bmt_mpi import BmtMpi
+from prepare import prepare
+from cleanup import remove
+from pattern import Pattern
+
+class Mdtest(BmtMpi):
+    pattern = Pattern(
+        rate      = r'^SUMMARY rate',
+        time      = r'^SUMMARY time',
+        operation = r'^[ \t]+(Directory|File|Tree) (creation|stat|read|removal)[ \t]*:[ \t]+(\S+)[ \t]+(\S+)[ \t]+(\S+)' )
+
+    # summary columns
+    operations = [
+        ('Directory', 'creation'), ('Directory', 'stat'), ('Directory', 'removal'),
+        ('File', 'creation'), ('File', 'stat'), ('File', 'read'), ('File', 'removal'),
+        ('Tree', 'creation'), ('Tree', 'removal') ]
+
+    def __init__(self, item=1000, depth=0, branch=1, directory='unique', type='both', size=0, iteration=1, **kwargs):
+        super().__init__(**kwargs)
+
+        self.name      = 'MDTEST'
+        self.bin       = os.path.join(self.bindir, 'mdtest')
+
+        self.item      = item
+        self.depth     = depth
+        self.branch    = branch
+        self.directory = directory
+        self.type      = type
+        self.size      = size
+        self.iteration = iteration
+
+        # shipped with IOR
+        self.src       = ['https://github.com/hpc/ior/releases/download/3.3.0/ior-3.3.0.tar.gz']
+
+        self.header    = [
+            'node', 'ntask', 'item', 'depth', 'branch', 'dir', 'type', 'size',
+            'dir_create(OPS)', 'dir_stat(OPS)', 'dir_remove(OPS)',
+            'file_create(OPS)', 'file_stat(OPS)', 'file_read(OPS)', 'file_remove(OPS)',
+            'tree_create(OPS)', 'tree_remove(OPS)']
+
+        self.parser.description = 'MDTEST Benchmark'
+
+    def build(self):
+        if os.path.exists(self.bin):
+            return
+
+        self.check_prerequisite('openmpi', '3')
+
+        self.buildcmd = [
+            [f'cd {self.builddir}', 'tar xf ior-3.3.0.tar.gz'],
+            [f'cd {self.builddir}/ior-3.3.0',
+               ['./configure',
+                   f'--prefix={os.path.abspath(self.prefix)}',
+                    'MPICC=mpicc',
+                    f'CPPFLAGS=-I{os.environ["MPI_ROOT"]}/include',
+                    f'LDFLAGS=-L{os.environ["MPI_ROOT"]}/lib'],
+                'make -j 8',
+                'make install' ]]
+
+        super().build()
+
+    def run(self):
+        os.chdir(self.outdir)
+
+        self.mpi.write_hostfile()
+
+        self.output = (
+            'mdtest-'
+                f'n{self.mpi.node}-'
+                f'p{self.mpi.task}-'
+                f'i{self.item}-'
+                f'z{self.depth}-'
+                f'b{self.branch}-'
+                f'{self.directory}-'
+                f'{self.type}-'
+                f'w{self.size}.out' )
+
+        # remove leftover tree and flush dentry/inode cache on all nodes (root) 
+        if os.getuid() == 0: 
+            prepare(self.nodelist, ['clean', 'sync', 'drop'], [self.testdir()])
+        else: 
+            prepare(self.nodelist[0:1], ['clean'], [self.testdir()])
+
+        super().run(1)
+
+        self.clean()
+
+    def execmd(self):
+        cmd = [
+            self.bin,
+               f'-n {self.item}',               # items per rank
+               f'-z {self.depth}',              # depth of directory tree
+               f'-b {self.branch}',             # branching factor of tree
+               f'-i {self.iteration}',          # iterations
+               f'-d {self.testdir()}' ]         # test directory
+
+        # unique working directory per rank (mdtest default: shared)
+        if self.directory == 'unique':
+            cmd.append('-u')
+
+        # files or directories only
+        if self.type == 'file':
+            cmd.append('-F')
+        elif self.type == 'dir':
+            cmd.append('-D')
+
+        # bytes written at create and read back
+        if self.size:
+            cmd += [f'-w {self.size}', f'-e {self.size}']
+
+        # stat/read/remove by tasks on the neighbouring node
+        if int(self.mpi.node) > 1:
+            cmd.append(f'-N {self.mpi.task}')
+
+        return cmd
+
+    def testdir(self):
+        return os.path.join(self.outdir, re.sub(r'\.out(\.\d+)?$', '.d', self.output))
+
+    def param(self):
+        return ",".join(map(str, [
+            self.mpi.node, self.mpi.task, self.item, self.depth, self.branch,
+            self.directory, self.type, self.size ]))
+
+    def parse(self):
+        key  = self.param()
+        rate = {}
+        flag = False
+
+        for name, groups in self.pattern.parse(self.output):
+            # rate table, the time table that follows is skipped
+            if name == 'rate':
+                flag = True
+            if name == 'time':
+                flag = False
+
+            # mean over iterations
+            if name == 'operation' and flag:
+                kind, operation, mean = groups[0], groups[1], groups[4]
+                rate[(kind, operation)] = float(mean)
+
+        for kind, operation in self.operations:
+            self.record(key, f'{kind.lower()}_{operation}', rate.get((kind, operation), '-'))
+
+    # leftover tree (failed run) is deleted while the next configuration runs
+    def clean(self):
+        remove([self.testdir()], background=True)
+
+    def add_argument(self):
+        super().add_argument()
+
+        self.parser.add_argument('--item'     , type=int, help='number of items per rank (default: 1000)')
+        self.parser.add_argument('--depth'    , type=int, help='depth of directory tree (default: 0)')
+        self.parser.add_argument('--branch'   , type=int, help='branching factor of directory tree (default: 1)')
+        self.parser.add_argument('--directory', type=str, choices=['unique', 'shared'], help='working directory per rank or shared (default: unique)')
+        self.parser.add_argument('--type'     , type=str, choices=['file', 'dir', 'both'], help='items to create (default: both)')
+        self.parser.add_argument('--size'     , type=int, help='bytes written to and read from each file (default: 0)')
+        self.parser.add_argument('--iteration', type=int, help='number of iterations (default: 1)')
@@ -2,7 +2,8 @@
 
 import os 
 
-from gpu import gpu_affinity
+from gpu      import gpu_affinity
+from topology import Topology
 
 class Mpi: 
     def __init__(self, nodelist=[], node=0, task=0, omp=0, gpu=0, bind=None, map=None, slurm=False, numa=False, verbose=0, hostfile='hostfile'):
@@ -61,11 +62,15 @@ class Mpi:
 
     def numactl(self): 
         cmd      = [] 
-        affinity = []  
 
-        for i in gpu_affinity()[0:self.gpu]: 
-            for j in range(0, int(self.task/self.gpu)): 
-                affinity.append(str(i))
+        # NUMA domains of GPUs or all NUMA domains of CPU-only host
+        if self.gpu: 
+            nodes = gpu_affinity()[0:self.gpu]
+        else: 
+            nodes = list(Topology().numa)
+
+        # consecutive ranks share a NUMA domain
+        affinity = [str(nodes[i*len(nodes)//self.task]) for i in range(0, self.task)]
 
         cmd += [
             'numactl', 
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import time
+
+class Pattern:
+    def __init__(self, **patterns):
+        self.index = {}
+        regexes    = []
+        group      = 1
+
+        # name -> position of its capture groups in the combined regex
+        for name, regex in patterns.items():
+            ngroups = re.compile(regex).groups
+
+            self.index[name] = (group, ngroups)
+            regexes.append(f'(?P<{name}>{regex})')
+
+            group += ngroups + 1
+
+        # all patterns are matched in a single pass
+        self.regex = re.compile('|'.join(regexes), re.MULTILINE)
+
+    # (name, groups) of every match in text
+    def scan(self, text):
+        for match in self.regex.finditer(text):
+            start, ngroups = self.index[match.lastgroup]
+
+            yield match.lastgroup, match.groups()[start:start+ngroups]
+
+    # read file in chunks, only complete lines are matched
+    def parse(self, path, size=1<<20):
+        with open(path, 'r') as fh:
+            remain = ''
+
+            while True:
+                chunk = fh.read(size)
+
+                if not chunk:
+                    break
+
+                text, _, remain = (remain + chunk).rpartition('\n')
+
+                yield from self.scan(text)
+
+            yield from self.scan(remain)
+
+    # follow a file that is still being written until done() is true
+    def follow(self, path, done, interval=1):
+        while not os.path.exists(path):
+            if done():
+                return
+
+            time.sleep(interval)
+
+        with open(path, 'r') as fh:
+            remain = ''
+
+            while True:
+                chunk = fh.read()
+
+                if chunk:
+                    text, _, remain = (remain + chunk).rpartition('\n')
+
+                    yield from self.scan(text)
+                elif done():
+                    # pick up data written after the last read
+                    yield from self.scan(remain + fh.read())
+
+                    break
+                else:
+                    time.sleep(interval)
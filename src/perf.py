@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+import os
+import glob
+import shlex
+import shutil
+import logging
+import subprocess
+
+from utils import probe
+
+# core events counted per rank, duration_time gives the elapsed time of each rank (ns)
+core   = ['duration_time', 'cycles', 'instructions', 'LLC-load-misses', 'LLC-store-misses']
+
+# flops per count: intel fp_arith_inst_retired, amd zen fp_ret_sse_avx_ops
+flops  = {
+    'fp_arith_inst_retired.scalar_double'     : 1,
+    'fp_arith_inst_retired.128b_packed_double': 2,
+    'fp_arith_inst_retired.256b_packed_double': 4,
+    'fp_arith_inst_retired.512b_packed_double': 8,
+    'fp_arith_inst_retired.scalar_single'     : 1,
+    'fp_arith_inst_retired.128b_packed_single': 4,
+    'fp_arith_inst_retired.256b_packed_single': 8,
+    'fp_arith_inst_retired.512b_packed_single': 16,
+    'fp_ret_sse_avx_ops.all'                  : 1 }
+
+# memory controller cas counts (64B lines), system-wide only: one counting rank per node
+uncore = ['uncore_imc/cas_count_read/', 'uncore_imc/cas_count_write/']
+
+# byte per unit of scaled uncore counts
+units  = {'B': 1, 'KiB': 1024, 'MiB': 1024**2, 'GiB': 1024**3}
+
+# rank from the MPI launcher (pid for concurrent non-MPI instances),
+# the first process on each node that creates the lock directory also counts uncore events system-wide.
+# events are selected on the launch node: ranks on nodes that cannot open them run without counters
+wrapper = '''#!/bin/sh
+prefix={prefix}
+rank=${{OMPI_COMM_WORLD_RANK:-${{PMI_RANK:-${{PMIX_RANK:-$(hostname).$$}}}}}}
+
+if ! perf stat -x, -e {core} -o /dev/null -- true 2>/dev/null; then
+    exec "$@"
+fi
+
+if [ -n "{uncore}" ] && perf stat -x, -a -e {uncore} -o /dev/null -- true 2>/dev/null && mkdir "$prefix.uncore.$(hostname)" 2>/dev/null; then
+    exec perf stat -x, --append -a -e {uncore} -o "$prefix.uncore.$(hostname)/counters" -- perf stat -x, --append -e {core} -o "$prefix.perf.$rank" -- "$@"
+fi
+
+exec perf stat -x, --append -e {core} -o "$prefix.perf.$rank" -- "$@"
+'''
+
+# perf stat around each rank of a benchmark command
+class Perf:
+    def __init__(self, events='default'):
+        # default: every event of the presets this host supports
+        if events == 'default':
+            events = core + list(flops) + uncore
+        elif isinstance(events, str):
+            events = events.split(',')
+
+        self.core   = [event for event in events if not system_wide(event) and supported(event)]
+        self.uncore = [event for event in events if system_wide(event) and supported(event, True)]
+
+        unsupported = [event for event in events if event not in self.core + self.uncore]
+
+        if unsupported:
+            logging.debug(f'{"Perf":7} : not supported {",".join(unsupported)}')
+
+    # executable script in front of the benchmark binary (shell quoted), counter files share prefix
+    def wrap(self, prefix):
+        script = f'{prefix}.perf.sh'
+
+        for stale in glob.glob(f'{prefix}.perf.*'):
+            os.remove(stale)
+
+        for stale in glob.glob(f'{prefix}.uncore.*'):
+            shutil.rmtree(stale)
+
+        with open(script, 'w') as fh:
+            fh.write(wrapper.format(prefix=shlex.quote(prefix), core=','.join(self.core), uncore=','.join(self.uncore)))
+
+        os.chmod(script, 0o755)
+
+        return shlex.quote(script)
+
+# sum over ranks and nodes, elapsed time is the slowest rank
+def collect(prefix):
+    counters = {}
+
+    for output in glob.glob(f'{prefix}.perf.*') + glob.glob(f'{prefix}.uncore.*/counters'):
+        if output.endswith('.sh'):
+            continue
+
+        elapsed = 0
+
+        for event, value in read(output):
+            if event == 'duration_time':
+                elapsed += value
+            else:
+                counters[event] = counters.get(event, 0) + value
+
+        if elapsed:
+            counters['duration_time'] = max(elapsed, counters.get('duration_time', 0))
+
+    return counters
+
+# roofline quantities from aggregated counters
+def derive(counters):
+    derived = {}
+    elapsed = counters.get('duration_time', 0)/10**9
+
+    if counters.get('cycles') and 'instructions' in counters:
+        derived['hw_ipc'] = counters['instructions']/counters['cycles']
+
+    flop = sum(counters[event]*weight for event, weight in flops.items() if event in counters)
+
+    # memory traffic from memory controllers, otherwise last level cache misses as lower bound
+    if any(event in counters for event in uncore):
+        traffic = sum(counters.get(event, 0) for event in uncore)
+    else:
+        traffic = 64*(counters.get('LLC-load-misses', 0) + counters.get('LLC-store-misses', 0))
+
+    if elapsed and flop:
+        derived['hw_gflops'] = flop/elapsed/10**9
+
+    if elapsed and traffic:
+        derived['hw_bandwidth'] = traffic/elapsed/10**9
+
+    if flop and traffic:
+        derived['hw_byte_per_flop'] = traffic/flop
+
+    return derived
+
+# value,unit,event,... (-x,), uncore counts are scaled to bytes
+def read(output):
+    with open(output) as fh:
+        for line in fh:
+            fields = line.strip().split(',')
+
+            if len(fields) < 3 or line.startswith('#'):
+                continue
+
+            try:
+                value = float(fields[0])
+            except ValueError:
+                continue
+
+            event = fields[2]
+
+            # duplicated uncore pmus (uncore_imc_0, ..) are merged by perf under the requested name
+            if event in uncore:
+                value *= units.get(fields[1], 64)
+
+            yield event, value
+
+def system_wide(event):
+    return event.startswith('uncore') or event.startswith('amd_df')
+
+# event can be opened on this host (cached per node until reboot), the wrapper checks again on every node
+@probe
+def supported(event, system=False):
+    if not shutil.which('perf'):
+        return False
+
+    pipe = subprocess.run(
+        ['perf', 'stat', '-x,'] + (['-a'] if system else []) + ['-e', event, '--', 'true'],
+        text=True, capture_output=True)
+
+    return pipe.returncode == 0 and '<not supported>' not in pipe.stderr
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import time
+import shlex
+import logging
+import subprocess
+
+from concurrent.futures import ThreadPoolExecutor
+
+from ssh import ssh_cmd
+
+# evict page cache of files without root: dirty pages are written back first
+fadvise = (
+    'import os, sys, glob\n'
+    'for path in [path for pattern in sys.argv[1:] for path in glob.glob(pattern)]:\n'
+    '    fd = os.open(path, os.O_RDONLY)\n'
+    '    os.fdatasync(fd)\n'
+    '    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)\n'
+    '    os.close(fd)' )
+
+# node preparation actions, executed in order
+actions = {
+    'clean'  : 'rm -rf {files}',
+    'sync'   : 'sync',
+    'drop'   : 'echo 3 > /proc/sys/vm/drop_caches',             # page cache, dentries and inodes
+    'compact': 'echo 1 > /proc/sys/vm/compact_memory',
+    'evict'  : f'python3 -c {shlex.quote(fadvise)} {{files}}' }
+
+# root required
+privileged = ['drop', 'compact']
+
+# actions without files are skipped
+per_file   = ['clean', 'evict']
+
+# files on the shared filesystem are removed once, from the first node
+shared     = ['clean']
+
+# run prep actions on all nodes concurrently, returns {node: (status, time)}
+def prepare(nodelist, action=['sync', 'drop'], files=[], launcher='ssh', workers=16, timeout=300):
+    action = select(action, files)
+
+    if not action or not nodelist:
+        return {}
+
+    start   = time.time()
+    report  = {}
+    scripts = assign(nodelist, action, files)
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(scripts))) as pool:
+        for node, status, elapsed in pool.map(
+            lambda node: execute(node, scripts[node], launcher, timeout), scripts):
+
+            report[node] = (status, elapsed)
+
+            logging.info(f'{"Prepare":7} : {node} {status} ({elapsed:.2f}s)')
+
+    logging.info(f'{"":7} : {",".join(action)} on {len(nodelist)} nodes ({time.time()-start:.2f}s)')
+
+    return report
+
+# shell form of prepare() for use between phases of a benchmark command
+def command(nodelist, action, files=[], launcher='ssh'):
+    action = select(action, files)
+
+    if not action or not nodelist:
+        return ''
+
+    # failed actions are reported on stderr so that the benchmark output is not polluted
+    return ' '.join(
+        f'{shlex.join(remote(node, body, launcher))} 1>&2 &' for node, body in assign(nodelist, action, files).items()) + ' wait'
+
+# script of each node, shared actions on the first node only, nodes without actions are left out
+def assign(nodelist, action, files=[]):
+    scripts = {}
+
+    for index, node in enumerate(nodelist):
+        local = [name for name in action if index == 0 or name not in shared]
+
+        if local:
+            scripts[node] = script(local, files)
+
+    return scripts
+
+def select(action, files=[]):
+    action = [name for name in actions if name in action]
+
+    # nothing to remove or evict
+    if not files:
+        action = [name for name in action if name not in per_file]
+
+    if os.getuid() != 0 and set(privileged) & set(action):
+        logging.warning('Cannot flush cache without root privileges!')
+
+        action = [name for name in action if name not in privileged]
+
+    return action
+
+# failed actions are echoed to stdout
+def script(action, files=[]):
+    return '; '.join(
+        f'{{ {actions[name].format(files=" ".join(map(pattern, files)))} ; }} 2>/dev/null || echo {name}' for name in action)
+
+# shell word of a path, wildcards are left unquoted for expansion
+def pattern(path):
+    return ''.join(
+        part if index % 2 else shlex.quote(part) for index, part in enumerate(re.split(r'([*?])', path)) if part)
+
+def remote(node, script, launcher='ssh'):
+    if node in ('localhost', os.uname().nodename, os.uname().nodename.split('.')[0]):
+        return ['sh', '-c', script]
+    elif launcher == 'srun':
+        return ['srun', '--overlap', '-N1', '-n1', f'-w{node}', 'sh', '-c', script]
+    else:
+        return ssh_cmd.split() + [node, script]
+
+def execute(node, script, launcher='ssh', timeout=300):
+    start = time.time()
+
+    try:
+        pipe   = subprocess.run(remote(node, script, launcher), text=True, capture_output=True, timeout=timeout)
+        failed = pipe.stdout.split()
+
+        if pipe.returncode != 0:
+            status = f'failed ({pipe.returncode})'
+        elif failed:
+            status = f'failed ({",".join(failed)})'
+        else:
+            status = 'ok'
+    except subprocess.TimeoutExpired:
+        status = 'timeout'
+
+    return node, status, time.time()-start
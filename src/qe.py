@@ -6,8 +6,12 @@ import logging
 import argparse
 
 from bmt_mpi import BmtMpi
+from pattern import Pattern
 
 class Qe(BmtMpi):
+    pattern = Pattern(
+        time = r'(?:PWSCF|NEB)\s+\:.*CPU\s*(?:(.+?)m)?\s*(.+?)s' )
+
     def __init__(self, input='Ausurf_512.in', npool=1, ntg=1, ndiag=1, nimage=1, neb=False, **kwargs): 
         super().__init__(**kwargs)
 
@@ -97,31 +101,23 @@ class Qe(BmtMpi):
         
         return cmd
 
-    def parse(self): 
-        time = '-' 
-
-        key  = ",".join(map(str, [
+    def param(self):
+        return ",".join(map(str, [
             os.path.basename(self.input), 
             self.mpi.node, self.mpi.task, self.mpi.omp, self.mpi.gpu,
             self.nimage, self.npool, self.ntg, self.ndiag ]))
 
-        with open(self.output, 'r') as fh:
-            regex = re.compile('(?:PWSCF|NEB)\s+\:.*CPU\s*(?:(.+?)m)?\s*(.+?)s')
-
-            for line in fh:
-                result = regex.search(line)
+    def parse(self): 
+        time = '-' 
+        key  = self.param()
 
-                if result:
-                    minute, second = result.groups()
-                    if not minute: 
-                        minute = 0.0
-                    
-                    time = 60*float(minute)+float(second)
+        for name, (minute, second) in self.pattern.parse(self.output):
+            if not minute:
+                minute = 0.0
 
-        if not self.result[key]['time']: 
-            self.result[key]['time'] = [] 
+            time = 60*float(minute)+float(second)
 
-        self.result[key]['time'].append(time)
+        self.record(key, 'time', time)
 
     def add_argument(self): 
         super().add_argument() 
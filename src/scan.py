@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+
+import os
+import copy
+import logging
+import cleanup
+import itertools
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+# benchmark object inherited by forked workers
+_bmt = None
+
+class Scan:
+    def __init__(self, bmt, select=None, **param):
+        self.bmt    = bmt
+        self.select = select
+        self.param  = param
+
+        # schedulable slots: free gpus and running jobs per node
+        self.free   = {}
+        self.load   = {}
+
+        for node in self.nodes():
+            self.free[node] = list(range(self.gpus()))
+            self.load[node] = 0
+
+    # cartesian product of parameters
+    def configs(self):
+        configs = []
+
+        for values in itertools.product(*self.param.values()):
+            config = dict(zip(self.param.keys(), values))
+
+            if self.select and not self.select(config):
+                continue
+
+            configs.append(config)
+
+        return configs
+
+    # configurations differing only in input file parameters share a single run (HPL.dat lists),
+    # the first configuration of a group carries the resource request
+    def groups(self):
+        batchable = getattr(self.bmt, 'batchable', [])
+        groups    = {}
+
+        for index, config in enumerate(self.configs()):
+            resource = tuple((opt, value) for opt, value in config.items() if opt not in batchable)
+
+            # keep every configuration on its own without batch support
+            if not batchable:
+                resource += (('index', index),)
+
+            groups.setdefault(resource, []).append((index, config))
+
+        return list(groups.values())
+
+    # benchmarks without mpi launcher run on the local host only
+    def nodes(self):
+        if hasattr(self.bmt, 'mpi') or hasattr(self.bmt, 'node'):
+            return self.bmt.nodelist
+
+        return self.bmt.nodelist[0:1]
+
+    # number of gpus per node
+    def gpus(self):
+        if hasattr(self.bmt, 'mpi') and self.bmt.mpi.cuda_devs:
+            return len(self.bmt.mpi.cuda_devs)
+
+        return len(self.bmt.device)
+
+    # (node, gpu) requirement of a configuration
+    def request(self, config):
+        if hasattr(self.bmt, 'mpi'):
+            node = config.get('node', self.bmt.mpi.node)
+            gpu  = config.get('gpu' , self.bmt.mpi.gpu )
+        else:
+            node = config.get('node', getattr(self.bmt, 'node', 1))
+            gpu  = 0
+
+        return int(node), int(gpu or 0)
+
+    # single node gpu jobs share a node, other jobs require exclusive nodes
+    def exclusive(self, config):
+        node, gpu = self.request(config)
+
+        return not gpu or node > 1
+
+    # first fit over nodelist
+    def allocate(self, config):
+        node, gpu = self.request(config)
+
+        hosts = []
+        for host in self.free:
+            if self.exclusive(config):
+                if self.load[host] == 0:
+                    hosts.append(host)
+            elif len(self.free[host]) >= gpu:
+                hosts.append(host)
+
+        if len(hosts) < node:
+            return None
+
+        allocation = {}
+        for host in hosts[0:node]:
+            if self.exclusive(config):
+                allocation[host] = self.free[host]
+            else:
+                allocation[host] = self.free[host][0:gpu]
+
+            self.free[host] = [i for i in self.free[host] if i not in allocation[host]]
+            self.load[host] += 1
+
+        return allocation
+
+    def release(self, allocation):
+        for host in allocation:
+            self.free[host] = sorted(self.free[host] + allocation[host])
+            self.load[host] -= 1
+
+    # concurrent jobs: one per gpu of shared nodes, one per node otherwise
+    def slots(self):
+        return sum(max(1, len(self.free[host])) for host in self.free)
+
+    def feasible(self, config):
+        node, gpu = self.request(config)
+
+        return node <= len(self.free) and gpu <= self.gpus()
+
+    def run(self):
+        global _bmt
+
+        _bmt    = self.bmt
+        pending = []
+        running = {}
+        results = {}
+
+        for group in self.groups():
+            index, config = group[0]
+
+            if self.feasible(config):
+                pending.append((index, group))
+            else:
+                logging.error(f'{"Scan":7} : {config} exceeds allocation')
+
+        context = multiprocessing.get_context('fork')
+        workers = self.slots()
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            while pending or running:
+                # backfill configs that fit in free slots
+                for index, group in list(pending):
+                    allocation = self.allocate(group[0][1])
+
+                    if allocation is None:
+                        continue
+
+                    for _, config in group:
+                        logging.info(f'{"Scan":7} : {config} -> {",".join(allocation)}')
+
+                    future = pool.submit(execute, index, [config for _, config in group], allocation, workers > 1)
+                    running[future] = allocation
+                    pending.remove((index, group))
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    self.release(running.pop(future))
+
+                    index, attrs = future.result()
+                    results[index] = attrs
+
+        # merge in scan order so that summary is reproducible
+        for index in sorted(results):
+            self.merge(results[index])
+
+    def merge(self, attrs):
+        self.bmt.name   = attrs['name']
+        self.bmt.header = attrs['header']
+
+        for key in attrs['result']:
+            for metric in attrs['result'][key]:
+                if not self.bmt.result[key][metric]:
+                    self.bmt.result[key][metric] = []
+
+                self.bmt.result[key][metric] += attrs['result'][key][metric]
+
+        for key in attrs['annotation']:
+            for column in attrs['annotation'][key]:
+                if not self.bmt.annotation[key][column]:
+                    self.bmt.annotation[key][column] = []
+
+                self.bmt.annotation[key][column] += attrs['annotation'][key][column]
+
+# worker: run a group of configurations on its own nodes/gpus
+def execute(index, group, allocation, concurrent=False):
+    bmt       = copy.deepcopy(_bmt)
+    nodes     = list(allocation)
+    batchable = getattr(bmt, 'batchable', [])
+    config    = {opt: value for opt, value in group[0].items() if opt not in batchable}
+
+    # idle detection samples the launch node, which is shared by all running configurations
+    if concurrent:
+        bmt.settle.enabled = False
+
+    # private working directory avoid clobbering hostfile/input
+    bmt.outdir   = os.path.join(bmt.outdir, f'scan-{index:04d}')
+    bmt.nodelist = nodes
+
+    os.makedirs(bmt.outdir, exist_ok=True)
+
+    for opt in config:
+        # pass attributes to MPI role
+        if hasattr(bmt, 'mpi') and opt in ['node', 'task', 'omp', 'gpu']:
+            setattr(bmt.mpi, opt, config[opt])
+        else:
+            setattr(bmt, opt, config[opt])
+
+    if hasattr(bmt, 'mpi'):
+        bmt.mpi.nodelist = nodes
+
+        # slot index -> visible device
+        gpus = allocation[nodes[0]][0:bmt.mpi.gpu]
+
+        if gpus:
+            if bmt.mpi.cuda_devs:
+                gpus = [bmt.mpi.cuda_devs[i] for i in gpus]
+
+            bmt.mpi.cuda_devs = gpus
+            bmt.mpi.env['CUDA_VISIBLE_DEVICES'] = ",".join(map(str, gpus))
+
+    # one input file with the cartesian product of the group's parameters
+    if batchable:
+        bmt.batch([{opt: value for opt, value in member.items() if opt in batchable} for member in group])
+    else:
+        bmt.run()
+
+    # background removal of test files is not joined when the pool shuts its workers down
+    cleanup.wait()
+
+    return index, {'name': bmt.name, 'header': bmt.header, 'result': bmt.result, 'annotation': bmt.annotation}
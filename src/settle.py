@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+import time
+import shutil
+import logging
+import subprocess
+
+class Settle:
+    def __init__(self, running=1, dirty=65536, gpu_util=5, gpu_temp=50, interval=0.5, timeout=30):
+        # idle thresholds
+        self.running  = running             # runnable tasks besides ourself
+        self.dirty    = dirty               # dirty page cache (kB)
+        self.gpu_util = gpu_util            # gpu utilization (%)
+        self.gpu_temp = gpu_temp            # gpu temperature (C)
+
+        self.interval = interval
+        self.timeout  = timeout
+        self.history  = []
+
+        # concurrent jobs of a scan keep the node busy: waiting would only run into the timeout
+        self.enabled  = True
+
+        self.nvidia   = shutil.which('nvidia-smi')
+
+    def sample(self):
+        sample = {}
+
+        # 4th field of loadavg: running/total scheduling entities
+        with open('/proc/loadavg', 'r') as fh:
+            sample['running'] = int(fh.read().split()[3].split('/')[0]) - 1
+
+        with open('/proc/meminfo', 'r') as fh:
+            for line in fh:
+                if line.startswith('Dirty:'):
+                    sample['dirty'] = int(line.split()[1])
+                    break
+
+        if self.nvidia:
+            query = subprocess.run(
+                [self.nvidia, '--query-gpu=utilization.gpu,temperature.gpu', '--format=csv,noheader,nounits'],
+                text=True, capture_output=True)
+
+            if query.returncode == 0:
+                util, temp = [], []
+
+                for line in query.stdout.splitlines():
+                    u, t = line.split(',')
+                    util.append(int(u))
+                    temp.append(int(t))
+
+                sample['gpu_util'] = max(util)
+                sample['gpu_temp'] = max(temp)
+
+        return sample
+
+    def idle(self, sample, last):
+        if sample['running'] > self.running:
+            return False
+
+        if sample.get('dirty', 0) > self.dirty:
+            return False
+
+        if sample.get('gpu_util', 0) > self.gpu_util:
+            return False
+
+        # gpu is either cool or no longer cooling down
+        if sample.get('gpu_temp', 0) > self.gpu_temp:
+            if not last or sample['gpu_temp'] < last['gpu_temp']:
+                return False
+
+        return True
+
+    def wait(self, timeout=None):
+        if not self.enabled:
+            return 0
+
+        timeout = timeout or self.timeout
+        start   = time.time()
+        last    = None
+
+        while True:
+            sample  = self.sample()
+            elapsed = time.time() - start
+
+            if self.idle(sample, last) or elapsed >= timeout:
+                break
+
+            last = sample
+            time.sleep(self.interval)
+
+        self.history.append(elapsed)
+
+        logging.info(f'{"Settle":7} : {elapsed:.1f}s{" (timeout)" if elapsed >= timeout else ""}')
+
+        return elapsed
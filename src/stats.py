@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+import math
+
+# two-sided 95% Student t quantiles by degree of freedom (larger dof: next smaller entry, conservative)
+student = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262, 10: 2.228,
+    12: 2.179, 15: 2.131, 20: 2.086, 25: 2.060, 30: 2.042, 40: 2.021, 60: 2.000, 120: 1.980 }
+
+def mean(samples):
+    return sum(samples)/len(samples)
+
+def median(samples):
+    ordered = sorted(samples)
+    middle  = len(ordered)//2
+
+    return ordered[middle] if len(ordered) % 2 else (ordered[middle-1] + ordered[middle])/2
+
+def stdev(samples):
+    if len(samples) < 2:
+        return 0
+
+    average = mean(samples)
+
+    return math.sqrt(sum((sample-average)**2 for sample in samples)/(len(samples)-1))
+
+# coefficient of variation
+def cv(samples):
+    average = mean(samples)
+
+    return stdev(samples)/abs(average) if average else 0
+
+# half width of 95% confidence interval of the mean
+def ci(samples):
+    if len(samples) < 2:
+        return math.inf
+
+    dof = len(samples) - 1
+    t   = student[max(key for key in student if key <= dof)]
+
+    return t*stdev(samples)/math.sqrt(len(samples))
+
+# half width relative to mean
+def relative_ci(samples):
+    average = mean(samples)
+
+    return ci(samples)/abs(average) if average else math.inf
+
+# modified z-score from median absolute deviation (Iglewicz and Hoaglin), robust to the outliers themselves
+def outliers(samples, cutoff=3.5):
+    if len(samples) < 3:
+        return []
+
+    center   = median(samples)
+    residual = [abs(sample-center) for sample in samples]
+    mad      = median(residual)
+
+    # more than half of the samples are identical: mean absolute deviation instead
+    if mad:
+        scale = mad/0.6745
+    else:
+        scale = 1.253314*mean(residual)
+
+    if not scale:
+        return []
+
+    return [index for index, value in enumerate(residual) if value/scale > cutoff]
+
+# samples with outliers removed
+def reject(samples, cutoff=3.5):
+    rejected = outliers(samples, cutoff)
+
+    return [sample for index, sample in enumerate(samples) if index not in rejected]
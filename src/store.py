@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+
+import os
+import datetime
+import subprocess
+
+schema = [
+    '''CREATE TABLE IF NOT EXISTS result (
+        id        INTEGER PRIMARY KEY,
+        benchmark TEXT,
+        config    TEXT,
+        metric    TEXT,
+        value     REAL,
+        repeat    INTEGER,
+        timestamp TEXT,
+        host      TEXT,
+        git       TEXT,
+        outdir    TEXT )''',
+    '''CREATE TABLE IF NOT EXISTS param (
+        result_id INTEGER REFERENCES result(id),
+        name      TEXT,
+        value )''',
+    '''CREATE TABLE IF NOT EXISTS run (
+        fingerprint TEXT,
+        repeat      INTEGER,
+        output      TEXT,
+        status      INTEGER,
+        timestamp   TEXT )''',
+    'CREATE INDEX IF NOT EXISTS result_config ON result(benchmark, config, metric)',
+    'CREATE INDEX IF NOT EXISTS result_time   ON result(timestamp)',
+    'CREATE INDEX IF NOT EXISTS param_name    ON param(name, value)',
+    'CREATE INDEX IF NOT EXISTS param_result  ON param(result_id)',
+    'CREATE INDEX IF NOT EXISTS run_config    ON run(fingerprint, repeat)' ]
+
+class Store:
+    def __init__(self, path, outdir=''):
+        self.path   = path
+        self.outdir = outdir
+        self.host   = os.uname().nodename
+
+        self._db    = None
+        self._pid   = None
+        self._git   = None
+
+    # resolved on first insert instead of forking git for every benchmark object
+    @property
+    def git(self):
+        if self._git is None:
+            self._git = git_hash(os.path.dirname(os.path.abspath(__file__)))
+
+        return self._git
+
+    # connection is opened lazily and never shared with forked workers
+    @property
+    def db(self):
+        if self._pid != os.getpid():
+            import sqlite3
+
+            self._db  = sqlite3.connect(self.path, timeout=60)
+            self._pid = os.getpid()
+
+            with self._db:
+                for sql in schema:
+                    self._db.execute(sql)
+
+        return self._db
+
+    # copies (scan workers) reopen their own connection
+    def __getstate__(self):
+        return dict(self.__dict__, _db=None, _pid=None)
+
+    def insert(self, benchmark, param, metric, value, repeat):
+        with self.db:
+            cursor = self.db.execute(
+                'INSERT INTO result (benchmark, config, metric, value, repeat, timestamp, host, git, outdir) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', (
+                    benchmark, ",".join(map(str, param.values())), metric, number(value), repeat,
+                    datetime.datetime.now().isoformat(timespec='seconds'), self.host, self.git, self.outdir))
+
+            self.db.executemany(
+                'INSERT INTO param (result_id, name, value) VALUES (?, ?, ?)',
+                [(cursor.lastrowid, name, number(param[name])) for name in param])
+
+    # mark measurement of a configuration as done (status = 0) or failed
+    def complete(self, fingerprint, repeat, output, status=0):
+        with self.db:
+            self.db.execute(
+                'INSERT INTO run (fingerprint, repeat, output, status, timestamp) VALUES (?, ?, ?, ?, ?)', (
+                    fingerprint, repeat, output, status, datetime.datetime.now().isoformat(timespec='seconds')))
+
+    # latest successful output of a configuration that still exists on disk
+    def lookup(self, fingerprint, repeat):
+        for output, in self.query(
+            'SELECT output FROM run WHERE fingerprint = ? AND repeat = ? AND status = 0 ORDER BY timestamp DESC',
+            (fingerprint, repeat)):
+
+            if os.path.exists(output):
+                return output
+
+    def query(self, sql, args=()):
+        return self.db.execute(sql, args).fetchall()
+
+# parsed int/float are stored as they are, strings are cast to int or float when possible, '-' (failed run) -> NULL
+def number(value):
+    if value == '-':
+        return None
+
+    # int() of a float truncates it (0.87 -> 0)
+    if isinstance(value, (int, float)):
+        return value
+
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except (TypeError, ValueError):
+            pass
+
+    return value
+
+def git_hash(path):
+    pipe = subprocess.run(
+        ['git', '-C', path, 'rev-parse', '--short', 'HEAD'], text=True, capture_output=True)
+
+    return pipe.stdout.strip() if pipe.returncode == 0 else ''
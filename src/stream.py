@@ -5,20 +5,41 @@ import re
 import logging
 import argparse
 
-from bmt import Bmt
+from bmt      import Bmt
+from pattern  import Pattern
+from topology import Topology, cpurange
+from sweep    import valid_size, sizes, footprint, report
+from stats    import median
 
 class Stream(Bmt):
-    def __init__ (self, size=40000000, ntimes=100, affinity='spread', omp=0, **kwargs):
+    pattern = Pattern(
+        kernel = r'^(Copy|Scale|Add|Triad):?[ \t]+(\S+)' )
+
+    def __init__ (self, size=0, ntimes=100, affinity='spread', omp=0, numa=False, sweep=False, **kwargs):
         super().__init__(**kwargs)
 
-        self.size     = size 
+        # each array is at least 4 x LLC
+        self.size     = size or valid_size(Topology().llc)
         self.ntimes   = ntimes 
         self.affinity = affinity
         self.omp      = omp or os.environ['SLURM_NTASKS_PER_NODE']
 
+        # NUMA matrix: threads on cores of domain cpu, memory on domain mem
+        self.numa     = numa
+        self.domains  = {}
+        self.cpu      = 'all'
+        self.mem      = 'all'
+
+        # bandwidth versus working set from L1 to beyond LLC
+        self.sweep    = sweep
+
+        # convergence of repeats (--ci) and bandwidth per watt
+        self.metric     = 'Triad'
+        self.efficiency = ('Triad', 1, 'GB/s/W')
+
         self.src      = ['https://www.cs.virginia.edu/stream/FTP/Code/stream.c']
 
-        self.header   = ['size', 'ntimes', 'thread', 'affinity', 'copy(GB/s)', 'scale(GB/s)', 'add(GB/s)', 'triad(GB/s)']
+        self.header   = ['size', 'ntimes', 'thread', 'affinity', 'cpu', 'mem', 'copy(GB/s)', 'scale(GB/s)', 'add(GB/s)', 'triad(GB/s)']
 
         self.parser.description = 'STREAM Benchmark'
 
@@ -35,18 +56,31 @@ class Stream(Bmt):
             self.cflags = '-fopenmp'
             self.bin    = os.path.join(self.bindir,'stream_gcc')
 
+        # array size is fixed at compile time: one binary per size, reused across runs
         self.buildcmd = [[
           [f'{self.cc}', 
                 '-O3', 
                 '-ffreestanding', 
                f'{self.cflags}', 
-               f'-DSTREAM_ARRAY_SIZE={str(self.size)}', 
+               f'{self.mcmodel(size)}', 
+               f'-DSTREAM_ARRAY_SIZE={str(size)}', 
                f'-DNTIMES={str(self.ntimes)}', 
-               f'-o {self.bin}', 
-               f'{self.builddir}/stream.c' ]]]
+               f'-o {self.executable(size)}', 
+               f'{self.builddir}/stream.c' ]] 
+            for size in (self.sizes() if self.sweep else [self.size]) if not os.path.exists(self.executable(size))]
         
         super().build()
 
+    def executable(self, size=None): 
+        return f'{self.bin}-{size or self.size}'
+
+    def sizes(self): 
+        return sizes(Topology().cache)
+
+    # static arrays beyond 2GB
+    def mcmodel(self, size): 
+        return '-mcmodel=medium' if footprint(size) >= 2**31 else ''
+
     def run(self): 
         os.chdir(self.outdir)
 
@@ -54,29 +88,123 @@ class Stream(Bmt):
         os.environ['OMP_PROC_BIND']   = self.affinity
         os.environ['OMP_NUM_THREADS'] = str(self.omp)
 
-        self.output = f'stream-{self.affinity}-omp_{self.omp}.out'
+        if self.numa: 
+            self.run_numa()
+        elif self.sweep: 
+            self.run_sweep()
+        else: 
+            self.output = f'stream-{self.affinity}-omp_{self.omp}.out'
+
+            super().run(1) 
+
+    # every (cpu, mem) pair of NUMA domains, then one concurrent instance per domain
+    def run_numa(self): 
+        omp          = self.omp
+        self.domains = Topology().numa
+
+        for cpu in self.compute(): 
+            for mem in self.domains: 
+                self.cpu, self.mem, self.omp = cpu, mem, len(self.domains[cpu])
+                
+                os.environ['OMP_NUM_THREADS'] = str(self.omp)
+
+                self.output = f'stream-{self.affinity}-omp_{self.omp}-c{cpu}-m{mem}.out'
+
+                super().run(1)
+
+        # aggregate bandwidth with local memory 
+        self.cpu, self.mem = 'each', 'local'
+        self.omp           = sum(len(self.domains[node]) for node in self.compute())
+        self.output        = f'stream-{self.affinity}-omp_{self.omp}-each.out'
+
+        super().run(1)
+
+        self.numa_matrix()
+
+        self.cpu, self.mem, self.omp = 'all', 'all', omp
+
+    # domains with cpus, memory-only nodes (CXL, HBM) are only a target of --membind
+    def compute(self): 
+        return [node for node in self.domains if self.domains[node]]
 
-        super().run(1) 
+    def run_sweep(self): 
+        size  = self.size
+        curve = {}
+
+        for self.size in self.sizes(): 
+            self.output = f'stream-{self.affinity}-omp_{self.omp}-{self.size}.out'
+
+            super().run(1)
+
+            triad = self.result[self.param()]['Triad']
+
+            if triad: 
+                curve[footprint(self.size)] = median(triad)
+
+        report(curve, Topology().cache)
+
+        self.size = size
 
     def runcmd(self): 
-        return [self.bin]
+        # perf stat (--profile)
+        executable = ' '.join(self.profiler() + [self.executable()])
+
+        if self.cpu == 'all': 
+            return [executable]
+
+        # concurrent instances: outputs are concatenated once all are done
+        if self.cpu == 'each': 
+            instances = [
+                f'OMP_NUM_THREADS={len(self.domains[node])} numactl --physcpubind={cpurange(self.domains[node])} --membind={node} {executable} > {self.output}.{node} &' 
+                for node in self.compute()]
+
+            return [
+                ' '.join(instances) + ' wait', 
+                ' '.join(['cat'] + [f'{self.output}.{node}' for node in self.compute()])]
+
+        return [[
+            'numactl', 
+               f'--physcpubind={cpurange(self.domains[self.cpu])}', 
+               f'--membind={self.mem}', 
+               executable ]]
+
+    def param(self):
+        return ",".join(map(str, [self.size, self.ntimes, self.omp, self.affinity, self.cpu, self.mem]))
 
     def parse(self):
-        key = ",".join(map(str, [self.size, self.ntimes, self.omp, self.affinity]))
+        key       = self.param()
+        bandwidth = {} 
+
+        # concurrent instances add up
+        for name, (kernel, rate) in self.pattern.parse(self.output):
+            bandwidth[kernel] = bandwidth.get(kernel, 0) + float(rate)/1000
+
+        for kernel in bandwidth: 
+            self.record(key, kernel, bandwidth[kernel])
+
+    # local vs remote triad bandwidth (GB/s) 
+    def numa_matrix(self): 
+        triad = {}
+
+        for key in self.result: 
+            size, ntimes, omp, affinity, cpu, mem = key.split(',')
+
+            if cpu.isdigit() and self.result[key]['Triad']: 
+                triad[(int(cpu), int(mem))] = median(self.result[key]['Triad'])
+
+        logging.info(f'{"NUMA":7} : {"Triad":>7}' + ''.join(f'{"mem "+str(mem):>10}' for mem in self.domains))
 
-        with open(self.output, 'r') as output_fh:
-            for line in output_fh:
-                for kernel in ['Copy', 'Scale', 'Add', 'Triad']: 
-                    if re.search(f'{kernel}:?', line):
-                        if not self.result[key][kernel]: 
-                            self.result[key][kernel] = []
+        for cpu in self.compute(): 
+            row = [triad.get((cpu, mem), '-') for mem in self.domains]
 
-                        self.result[key][kernel].append(float(line.split()[1])/1000)
+            logging.info(f'{"":7} : {"cpu "+str(cpu):>7}' + ''.join(f'{value:>10.2f}' if value != '-' else f'{value:>10}' for value in row))
 
     def add_argument(self):
         super().add_argument()
 
-        self.parser.add_argument('--size'    , type=int, help='size of matrix (default: 40000000)')
+        self.parser.add_argument('--size'    , type=int, help='size of matrix (default: 4 x LLC)')
         self.parser.add_argument('--ntimes'  , type=int, help='run each kernel n times (default: 100)')
         self.parser.add_argument('--omp'     , type=int, metavar='OMP_NUM_THREADS', help='number of threads (default: 0)')
         self.parser.add_argument('--affinity', type=str, metavar='OMP_PROC_BIND', help='thread affinity (default: spread)')
+        self.parser.add_argument('--numa'    , action='store_true', help='bandwidth matrix between NUMA domains with numactl')
+        self.parser.add_argument('--sweep'   , action='store_true', help='bandwidth versus working set from L1 to beyond LLC')
@@ -6,14 +6,22 @@ import logging
 import argparse
 
 from babel_stream import BabelStream
+from topology     import Topology
+from sweep        import sizes, footprint, report
+from stats        import median
 
 class StreamOmp(BabelStream):
-    def __init__ (self, affinity='spread', omp=0, ntimes=100, **kwargs):
+    def __init__ (self, affinity='spread', omp=0, ntimes=100, sweep=False, **kwargs):
         super().__init__(**kwargs)
 
         self.affinity = affinity
         self.omp      = omp or os.environ['SLURM_NTASKS_PER_NODE']
 
+        # bandwidth versus working set from L1 to beyond LLC (-s at runtime, same binary)
+        self.sweep    = sweep
+        self.metric     = 'Triad'
+        self.efficiency = ('Triad', 1, 'GB/s/W')
+
         self.model    = 'OMP'
         self.stream   = 'OMPStream.cpp'
         self.src      = [ 
@@ -45,9 +53,31 @@ class StreamOmp(BabelStream):
         os.environ['OMP_PROC_BIND']   = self.affinity
         os.environ['OMP_NUM_THREADS'] = str(self.omp)
 
-        self.output = f'babelstream-{self.affinity}-omp_{self.omp}.out'
+        if self.sweep: 
+            self.run_sweep()
+        else: 
+            self.output = f'babelstream-{self.affinity}-omp_{self.omp}.out'
+
+            super().run(1) 
+
+    def run_sweep(self): 
+        size  = self.size
+        cache = Topology().cache
+        curve = {}
+
+        for self.size in sizes(cache): 
+            self.output = f'babelstream-{self.affinity}-omp_{self.omp}-{self.size}.out'
+
+            super().run(1)
+
+            triad = self.result[self.param()]['Triad']
+
+            if triad: 
+                curve[footprint(self.size)] = median(triad)
+
+        report(curve, cache)
 
-        super().run(1) 
+        self.size = size
 
     def param(self): 
         return ",".join(map(str, [self.size, self.ntimes, self.omp, self.affinity]))
@@ -57,3 +87,4 @@ class StreamOmp(BabelStream):
 
         self.parser.add_argument('--omp'     , type=int, metavar='OMP_NUM_THREADS', help='number of threads (default: 0)')
         self.parser.add_argument('--affinity', type=str, metavar='OMP_PROC_BIND', help='thread affinity (default: spread)')
+        self.parser.add_argument('--sweep'   , action='store_true', help='bandwidth versus working set from L1 to beyond LLC')
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+import math
+import logging
+
+# working set of STREAM kernels: a, b, c in double precision
+arrays  = 3
+element = 8
+
+def footprint(size):
+    return arrays*element*size
+
+# capacity of data/unified cache levels of the whole host in byte
+def capacity(cache):
+    return {name: cache[name]['size']*cache[name]['instances'] for name in cache if not name.endswith('i')}
+
+# STREAM run rule: each array is at least 4 x last level cache, rounded up to a million elements
+def valid_size(llc, default=40000000):
+    if not llc:
+        return default
+
+    return math.ceil(4*llc/element/10**6)*10**6
+
+# array sizes stepping geometrically from half of L1 to a valid STREAM working set, steps per octave
+def sizes(cache, steps=2):
+    levels = capacity(cache)
+
+    if not levels:
+        return []
+
+    lower = min(levels.values())/2
+    upper = footprint(valid_size(max(levels.values())))
+    count = math.ceil(steps*math.log2(upper/lower))
+
+    return sorted(set(int(lower*2**(i/steps))//footprint(1) for i in range(count)) | {valid_size(max(levels.values()))})
+
+# consecutive bandwidth drops larger than threshold form one knee,
+# which is attributed to the cache level closest in capacity (log scale)
+def knees(curve, cache, threshold=0.15):
+    levels = capacity(cache)
+    points = sorted(curve.items())
+    drops  = []
+    groups = []
+
+    for (small, before), (large, after) in zip(points, points[1:]):
+        if after < (1-threshold)*before:
+            drops.append((small, before, large, after))
+        elif drops:
+            groups.append(drops)
+            drops = []
+
+    if drops:
+        groups.append(drops)
+
+    result = []
+
+    for drops in groups:
+        # steepest step within the transition
+        small, before, large, after = min(drops, key=lambda drop: drop[3]/drop[1])
+        working = math.sqrt(small*large)
+        level   = min(levels, key=lambda name: abs(math.log(levels[name]/working))) if levels else '-'
+
+        result.append((level, working, drops[0][1], drops[-1][3]))
+
+    return result
+
+# bandwidth (GB/s) versus footprint (byte) and detected knees
+def report(curve, cache, kernel='Triad'):
+    logging.info(f'{"Sweep":7} : {"footprint":>10} {kernel+"(GB/s)":>12}')
+
+    for working in sorted(curve):
+        logging.info(f'{"":7} : {human(working):>10} {curve[working]:>12.2f}')
+
+    for level, working, before, after in knees(curve, cache):
+        logging.info(f'{"Knee":7} : {level:>3} at {human(working)} ({before:.2f} -> {after:.2f} GB/s)')
+
+# 49152 -> 48.0K
+def human(size):
+    for unit in ['', 'K', 'M', 'G']:
+        if size < 1024 or unit == 'G':
+            return f'{size:.1f}{unit}'
+
+        size /= 1024
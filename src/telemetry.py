@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import glob
+import time
+import shutil
+import logging
+import threading
+import subprocess
+import collections
+
+from topology import read
+
+# node state sampled in background while a benchmark runs,
+# only the node running this process is sampled: MPI ranks on other nodes are not covered
+class Telemetry:
+    # time series columns
+    header = ['time', 'cpu(%)', 'freq(MHz)', 'available(MB)', 'swap(MB)', 'pswpout', 'throttle', 'gpu(MHz)', 'gpu(W)']
+
+    # summary columns next to result table, every metric goes to the store
+    columns = {'freq': 'freq(MHz)', 'throttle': 'throttle'}
+
+    def __init__(self, interval=1.0, capacity=86400, root='/'):
+        self.interval = interval            # sampling period (s), 0: disabled
+        self.root     = root
+
+        # ring buffer of tuples in header order, oldest samples are dropped on long runs
+        self.samples  = collections.deque(maxlen=capacity)
+
+        self.freq     = glob.glob(self.path('sys/devices/system/cpu/cpu[0-9]*/cpufreq/scaling_cur_freq'))
+        self.throttle = glob.glob(self.path('sys/devices/system/cpu/cpu[0-9]*/thermal_throttle/*_throttle_count'))
+        self.nvidia   = shutil.which('nvidia-smi')
+
+        # created per run: benchmark objects are deep-copied into scan workers and locks cannot be copied
+        self.thread   = None
+        self.dmon     = None
+        self.gpu      = None
+        self.stopped  = None
+
+    def path(self, *path):
+        return os.path.join(self.root, *path)
+
+    def start(self, gpu=False):
+        if not self.interval:
+            return
+
+        self.samples.clear()
+        self.stopped  = threading.Event()
+
+        self.begin    = time.time()
+        self.previous = self.counters()
+
+        # dmon streams one line per device and period: gpu pwr gtemp mtemp mclk pclk
+        if gpu and self.nvidia:
+            self.dmon = subprocess.Popen(
+                [self.nvidia, 'dmon', '-s', 'pc', '-d', str(max(1, int(self.interval)))],
+                text=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+            threading.Thread(target=self.read_dmon, daemon=True).start()
+
+        self.thread = threading.Thread(target=self.loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if not self.thread:
+            return
+
+        self.stopped.set()
+        self.thread.join()
+
+        if self.dmon:
+            self.dmon.terminate()
+            self.dmon.wait()
+
+        # short runs get at least one sample
+        if not self.samples:
+            self.sample()
+
+        self.thread  = None
+        self.dmon    = None
+        self.gpu     = None
+        self.stopped = None
+
+    def loop(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def read_dmon(self):
+        clock = {}
+        power = {}
+
+        for line in self.dmon.stdout:
+            if line.startswith('#'):
+                continue
+
+            fields = line.split()
+
+            # Idx Pwr Gtemp Mtemp Mclk Pclk
+            if len(fields) >= 6:
+                power[fields[0]] = number(fields[1])
+                clock[fields[0]] = number(fields[5])
+
+                self.gpu = (average(clock.values()), sum(value for value in power.values() if value != '-'))
+
+    # monotonic counters: cpu time from /proc/stat (busy, total), swapped out pages, throttle events
+    def counters(self):
+        stat   = read(self.path('proc/stat')).split('\n', 1)[0].split()[1:]
+        ticks  = [int(tick) for tick in stat]
+        idle   = sum(ticks[3:5])
+        vmstat = re.search(r'^pswpout (\d+)', read(self.path('proc/vmstat')), re.MULTILINE)
+
+        return (
+            sum(ticks) - idle, sum(ticks),
+            int(vmstat.group(1)) if vmstat else 0,
+            sum(int(read(counter, '0')) for counter in self.throttle) )
+
+    def sample(self):
+        busy, total, pswpout, throttle = self.counters()
+
+        meminfo = {}
+
+        for line in read(self.path('proc/meminfo')).splitlines():
+            name, value = line.split(':', 1)
+            meminfo[name] = int(value.split()[0])
+
+        gpu     = self.gpu or ('-', '-')
+        elapsed = total - self.previous[1]
+
+        self.samples.append((
+            round(time.time()-self.begin, 2),
+            round(100*(busy-self.previous[0])/elapsed, 1) if elapsed else '-',
+            average([int(read(freq, '0'))/1000 for freq in self.freq]),
+            meminfo.get('MemAvailable', 0)//1024,
+            (meminfo.get('SwapTotal', 0) - meminfo.get('SwapFree', 0))//1024,
+            pswpout - self.previous[2],
+            throttle - self.previous[3],
+            gpu[0], gpu[1] ))
+
+        self.previous = (busy, total, pswpout, throttle)
+
+    # time series next to benchmark output
+    def save(self, output):
+        if not self.samples:
+            return
+
+        with open(f'{output}.telemetry', 'w') as fh:
+            fh.write(','.join(self.header) + '\n')
+
+            for sample in self.samples:
+                fh.write(','.join(map(str, sample)) + '\n')
+
+    def load(self, output):
+        self.samples.clear()
+
+        for line in read(f'{output}.telemetry').splitlines()[1:]:
+            self.samples.append(tuple(number(field) for field in line.split(',')))
+
+    # mean frequency, throttle events and swap activity over the run
+    def summary(self):
+        columns = list(zip(*self.samples)) or [[]]*len(self.header)
+        series  = dict(zip(self.header, columns))
+
+        return {
+            'freq'     : average(series['freq(MHz)']),
+            'throttle' : sum(series['throttle']) if self.throttle and self.samples else '-',
+            'cpu'      : average(series['cpu(%)']),
+            'swap'     : max(series['swap(MB)'], default='-'),
+            'pswpout'  : sum(series['pswpout']),
+            'gpu_freq' : average(series['gpu(MHz)']),
+            'gpu_power': average(series['gpu(W)']) }
+
+def number(string):
+    try:
+        return float(string)
+    except ValueError:
+        return '-'
+
+# '-': not available
+def average(values):
+    values = [value for value in values if value != '-']
+
+    return round(sum(values)/len(values), 1) if values else '-'
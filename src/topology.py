@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import glob
+
+# host topology from /proc and /sys, no external commands
+class Topology:
+    def __init__(self, root='/'):
+        self.root     = root
+
+        self.model    = ''
+        self.flags    = []
+        self.cpus     = []
+        self.sockets  = 0
+        self.cores    = 0
+        self.threads  = 1
+        self.numa     = {}
+        self.cache    = {}
+        self.meminfo  = {}
+        self.hugepage = {}
+
+        self.read_cpuinfo()
+        self.read_cpu()
+        self.read_node()
+        self.read_cache()
+        self.read_meminfo()
+        self.read_hugepage()
+
+    def path(self, *path):
+        return os.path.join(self.root, *path)
+
+    def read_cpuinfo(self):
+        cpuinfo = read(self.path('proc/cpuinfo'))
+
+        # x86: model name/flags, aarch64: CPU part/Features, power: cpu
+        for name in ['model name', 'Model', 'cpu model', 'cpu']:
+            match = re.search(rf'^{name}\s*: (.+)$', cpuinfo, re.MULTILINE)
+
+            if match:
+                self.model = match.group(1).strip()
+                break
+
+        match = re.search(r'^(?:flags|Features)\s*: (.+)$', cpuinfo, re.MULTILINE)
+
+        if match:
+            self.flags = match.group(1).split()
+
+        self.cpus = [int(cpu) for cpu in re.findall(r'^processor\s*: (\d+)', cpuinfo, re.MULTILINE)]
+
+    def read_cpu(self):
+        online = read(self.path('sys/devices/system/cpu/online'))
+
+        if online:
+            self.cpus = cpulist(online)
+
+        packages = set()
+        cores    = set()
+
+        for cpu in self.cpus:
+            topology = self.path(f'sys/devices/system/cpu/cpu{cpu}/topology')
+            package  = read(os.path.join(topology, 'physical_package_id'), '0')
+            core     = read(os.path.join(topology, 'core_id'), str(cpu))
+
+            packages.add(package)
+            cores.add((package, core))
+
+        self.sockets = len(packages) or 1
+        self.cores   = len(cores) or len(self.cpus)
+        self.threads = max(1, len(self.cpus)//max(1, self.cores))
+
+    def read_node(self):
+        for node in glob.glob(self.path('sys/devices/system/node/node[0-9]*')):
+            self.numa[int(re.search(r'node(\d+)$', node).group(1))] = cpulist(read(os.path.join(node, 'cpulist')))
+
+        # kernel without NUMA support
+        if not self.numa:
+            self.numa[0] = list(self.cpus)
+
+        self.numa = dict(sorted(self.numa.items()))
+
+    # size of one instance and number of instances per cache level
+    def read_cache(self):
+        shared = {}
+
+        for cpu in self.cpus:
+            for index in glob.glob(self.path(f'sys/devices/system/cpu/cpu{cpu}/cache/index[0-9]*')):
+                level = read(os.path.join(index, 'level'))
+                kind  = read(os.path.join(index, 'type'))
+                name  = f'L{level}' + {'Data': 'd', 'Instruction': 'i'}.get(kind, '')
+
+                if name not in self.cache:
+                    self.cache[name] = {'size': size(read(os.path.join(index, 'size'), '0')), 'instances': 0}
+                    shared[name]     = set()
+
+                shared[name].add(read(os.path.join(index, 'shared_cpu_list')))
+
+        for name in shared:
+            self.cache[name]['instances'] = len(shared[name])
+
+        self.cache = dict(sorted(self.cache.items()))
+
+    # values in kB except HugePages_*
+    def read_meminfo(self):
+        for line in read(self.path('proc/meminfo')).splitlines():
+            name, value = line.split(':', 1)
+            self.meminfo[name] = int(value.split()[0])
+
+    # total/free pages per page size (kB)
+    def read_hugepage(self):
+        for pool in glob.glob(self.path('sys/kernel/mm/hugepages/hugepages-*kB')):
+            self.hugepage[int(re.search(r'hugepages-(\d+)kB$', pool).group(1))] = {
+                'total': int(read(os.path.join(pool, 'nr_hugepages'), '0')),
+                'free' : int(read(os.path.join(pool, 'free_hugepages'), '0')) }
+
+    @property
+    def memory(self):
+        return self.meminfo.get('MemTotal', 0)
+
+    # last level cache size of the whole host in byte
+    @property
+    def llc(self):
+        if not self.cache:
+            return 0
+
+        last = max(self.cache, key=lambda name: int(re.search(r'\d+', name).group(0)))
+
+        return self.cache[last]['size']*self.cache[last]['instances']
+
+    def avx(self):
+        return [flag.upper() for flag in self.flags if flag.startswith('avx')]
+
+    def node(self, cpu):
+        for node in self.numa:
+            if cpu in self.numa[node]:
+                return node
+
+def read(path, default=''):
+    try:
+        with open(path) as fh:
+            return fh.read().strip()
+    except OSError:
+        return default
+
+# 0-3,8-11 -> [0, 1, 2, 3, 8, 9, 10, 11]
+def cpulist(string):
+    cpus = []
+
+    for field in filter(None, string.split(',')):
+        first, _, last = field.partition('-')
+        cpus += range(int(first), int(last or first)+1)
+
+    return cpus
+
+# 48K -> 49152
+def size(string):
+    number, unit = re.match(r'(\d+)\s*([KMG]?)', string).groups()
+
+    return int(number)*1024**' KMG'.index(unit or ' ')
+
+# [0, 1, 2, 3, 8] -> 0-3,8
+def cpurange(cpus):
+    ranges = []
+
+    for cpu in sorted(cpus):
+        if ranges and ranges[-1][1] == cpu-1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+
+    return ','.join(f'{first}-{last}' if last > first else f'{first}' for first, last in ranges)
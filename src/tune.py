@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+
+import math
+import logging
+
+# successive halving: all candidates are probed with the smallest budget,
+# the best 1/eta survive to the next (larger) budget
+def successive_halving(candidates, evaluate, budgets, eta=3):
+    ranked = []
+
+    for rung, budget in enumerate(budgets):
+        scores = evaluate(candidates, budget)
+
+        # failed probes (None) are pruned
+        ranked = sorted(
+            [(score, candidate) for score, candidate in zip(scores, candidates) if score is not None],
+            key=lambda x: x[0], reverse=True)
+
+        logging.info(f'{"Tune":7} : rung {rung} ({budget}) {len(candidates)} -> {len(ranked)} candidates')
+
+        for score, candidate in ranked[0:eta]:
+            logging.info(f'{"":7} : {score:.2f} {candidate}')
+
+        if not ranked:
+            break
+
+        candidates = [candidate for score, candidate in ranked[0:max(1, math.ceil(len(ranked)/eta))]]
+
+    return ranked
@@ -3,7 +3,10 @@
 import os
 import re
 import sys
+import json
 import logging
+import functools
+import threading
 import subprocess
 import collections 
 
@@ -11,46 +14,134 @@ import collections
 def autovivification():
     return collections.defaultdict(autovivification)
 
-# clear cache on client (root required)
+# hardware probes: memoised in process and cached per node until next boot
+inventory_dir = os.environ.get('BMT_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'bmt'))
+inventory     = {}
+
+def boot_id():
+    try:
+        with open('/proc/sys/kernel/random/boot_id') as fh:
+            return fh.read().strip()
+    except OSError:
+        return ''
+
+def inventory_file():
+    return os.path.join(inventory_dir, f'{os.uname().nodename}.json')
+
+def load_inventory():
+    try:
+        with open(inventory_file()) as fh:
+            cache = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+    # stale after reboot (driver, firmware or hardware may have changed)
+    if cache.get('boot_id') != boot_id():
+        return {}
+
+    return cache.get('probe', {})
+
+def save_inventory():
+    try:
+        os.makedirs(inventory_dir, exist_ok=True)
+
+        # atomic replace: concurrent scan workers may write at the same time
+        tmp = f'{inventory_file()}.{os.getpid()}'
+
+        with open(tmp, 'w') as fh:
+            json.dump({'boot_id': boot_id(), 'probe': inventory}, fh, indent=2)
+
+        os.replace(tmp, inventory_file())
+    except OSError as error:
+        logging.debug(f'{"Cache":7} : {error}')
+
+def probe(func):
+    @functools.wraps(func)
+    def wrapper(*args):
+        key = ':'.join([func.__name__] + list(map(str, args)))
+
+        if not inventory:
+            inventory.update(load_inventory())
+
+        if key not in inventory:
+            inventory[key] = func(*args)
+            save_inventory()
+
+        return inventory[key]
+
+    return wrapper
+
+# drop memoised and cached probes (hardware or driver changed without reboot)
+def invalidate():
+    inventory.clear()
+
+    if os.path.exists(inventory_file()):
+        os.remove(inventory_file())
+
+# clear cache on all clients (root required)
 def sync(nodelist=[]):
-    if os.getuid() == 0:
-        for node in nodelist:
-            syscmd('sync; echo 1 > /proc/sys/vm/drop_caches')
-    else:
-        logging.warning('Cannot flush cache without root privileges!')
+    from prepare import prepare
 
-# wrapper for system commands 
-def syscmd(cmd, output=None):
-    pipe = subprocess.run(fmt_cmd(cmd), shell=True, text=True, capture_output=True)
+    return prepare(nodelist, ['sync', 'drop'])
 
-    # redirect output to file
+# generic debug message: --report-bindings (stderr), SHARP_COLL_LOG_LEVEL=3 (stdout)
+debug_regex = re.compile(r'^\[.+?\]')
+
+# wrapper for system commands
+def syscmd(cmd, output=None, tail=100):
+    # stream output to file
     if output:
-        # generic debug message: --report-bindings (to stderr) 
-        for line in pipe.stderr.splitlines():
-            if re.search('^\[.+?\]', line): 
-                logging.info(line)
-
-        with open(output, "w") as output_fh:
-            for line in pipe.stdout.splitlines():
-                #  debug message: SHARP_COLL_LOG_LEVEL=3 (to stdout)
-                if re.search('^\[.+?\]', line): 
-                    logging.info(line)
-                else: 
-                    output_fh.write(f'{line}\n')
-        
-        # GROMACS: tunepme fails -> exit code 1 (fatal) 
-        # QE 6.8: STOP message   -> exit code 2 (non fatal)
-        # QE 7.0: No issues
-        if pipe.returncode == 0 or pipe.returncode == 2:
-            return 0
+        return stream_cmd(cmd, output, tail)
+
+    pipe = subprocess.run(fmt_cmd(cmd), shell=True, text=True, capture_output=True)
 
+    if pipe.returncode != 0:
         logging.error(pipe.stderr)
-    else: 
-        if pipe.returncode != 0: 
-            logging.error(pipe.stderr)
-            sys.exit()
-        else: 
-            return pipe.stdout
+        sys.exit()
+    else:
+        return pipe.stdout
+
+# write stdout to file as it arrives, only the last lines of stderr are kept
+def stream_cmd(cmd, output, tail=100):
+    stderr = collections.deque(maxlen=tail)
+    pipe   = subprocess.Popen(
+        fmt_cmd(cmd), shell=True, text=True, bufsize=1,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def drain_stderr():
+        for line in pipe.stderr:
+            if debug_regex.match(line):
+                logging.info(line.rstrip('\n'))
+            else:
+                stderr.append(line)
+
+    reader = threading.Thread(target=drain_stderr, daemon=True)
+    reader.start()
+
+    # live tail (LOGLEVEL=DEBUG)
+    live   = logging.getLogger().isEnabledFor(logging.DEBUG)
+
+    # line buffered so that the output can be followed while running
+    with open(output, 'w', buffering=1) as output_fh:
+        for line in pipe.stdout:
+            if debug_regex.match(line):
+                logging.info(line.rstrip('\n'))
+            else:
+                output_fh.write(line)
+
+                if live:
+                    logging.debug(f'{"":7} | {line.rstrip()}')
+
+    reader.join()
+    pipe.wait()
+
+    # GROMACS: tunepme fails -> exit code 1 (fatal)
+    # QE 6.8: STOP message   -> exit code 2 (non fatal)
+    # QE 7.0: No issues
+    if pipe.returncode == 0 or pipe.returncode == 2:
+        return 0
+
+    logging.error("".join(stderr))
 
 def fmt_cmd(cmds): 
     level = 0 
@@ -2,13 +2,17 @@
 
 import os
 import glob 
-import shutil 
+
+from cleanup import remove
+
+rundirs = [] 
 
 for rundir in [
         '../run/STREAM/ORG',
         '../run/STREAM/CUDA',
         '../run/IOZONE', 
         '../run/IOR', 
+        '../run/MDTEST', 
         '../run/HPL', 
         '../run/HPCG', 
         '../run/QE', 
@@ -16,4 +20,7 @@ for rundir in [
 
     for subdir in glob.glob('/'.join([rundir, '*'])): 
         if os.path.isdir(subdir):
-            shutil.rmtree(subdir)
+            rundirs.append(subdir)
+
+# unlink with a thread pool, large parallel filesystems are latency bound
+remove([glob.escape(rundir) for rundir in rundirs], workers=64)
@@ -29,6 +29,10 @@ bmt = {
         'env' : ['gcc/8.3.0', 'mpi/openmpi-3.1.5'],
         'cmd' : [f'./test_ior.py --repeat {n}']}, 
 
+    'mdtest' : { 
+        'env' : ['gcc/8.3.0', 'mpi/openmpi-3.1.5'],
+        'cmd' : [f'./test_mdtest.py --repeat {n}']}, 
+
     'qe' : { 
         'env' : ['gcc/8.3.0', 'nvidia_hpc_sdk/21.5'],
         'cmd' : [f'./test_qe_cuda.py --repeat {n}']}, 
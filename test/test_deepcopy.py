@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import copy
+import shutil
+import tempfile
+
+# scan workers deep-copy the benchmark after its store has been opened
+tmpdir = tempfile.mkdtemp(prefix='bmt-')
+
+os.environ['BMT_CACHE'] = os.path.join(tmpdir, 'cache')
+os.environ.setdefault('SLURM_NODELIST', 'localhost')
+
+from bmt import Bmt
+
+failed = []
+
+def check(name, condition):
+    print(f'{name:<24} : {"ok" if condition else "FAILED"}')
+
+    if not condition:
+        failed.append(name)
+
+bmt = Bmt(prefix=tmpdir, outdir=os.path.join(tmpdir, 'output'))
+bmt.store.lookup('fingerprint', 1)
+
+try:
+    clone = copy.deepcopy(bmt)
+except TypeError as error:
+    print(error)
+    clone = None
+
+check('deepcopy', clone is not None)
+
+if clone:
+    check('store path', clone.store.path == bmt.store.path)
+    check('store connection', clone.store.query('SELECT count(*) FROM run') == [(0,)] and clone.store.db is not bmt.store.db)
+
+shutil.rmtree(tmpdir)
+
+if failed:
+    print(f'failed: {" ".join(failed)}')
+    sys.exit(1)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import argparse
+import tempfile
+
+# HPL-NVIDIA parse and batch attribution against the reference output (run/HPL/result.ref)
+parser = argparse.ArgumentParser(description='HPL-NVIDIA parse guard')
+parser.add_argument('--keep', action='store_true', help='keep temporary output directory')
+args   = parser.parse_args()
+
+tmpdir = tempfile.mkdtemp(prefix='bmt-')
+
+# fake nvidia-smi and a private probe cache
+os.makedirs(os.path.join(tmpdir, 'bin'))
+
+with open(os.path.join(tmpdir, 'bin', 'nvidia-smi'), 'w') as fh:
+    fh.write('#!/bin/sh\n'
+             'echo "GPU 0: Tesla V100-PCIE-32GB (UUID: GPU-0)"\n'
+             'echo "GPU 1: Tesla V100-PCIE-32GB (UUID: GPU-1)"\n')
+
+os.chmod(os.path.join(tmpdir, 'bin', 'nvidia-smi'), 0o755)
+
+os.environ['PATH']      = os.path.join(tmpdir, 'bin') + os.pathsep + os.environ['PATH']
+os.environ['BMT_CACHE'] = os.path.join(tmpdir, 'cache')
+os.environ.setdefault('SLURM_NODELIST', 'localhost')
+os.environ.setdefault('SLURM_NTASKS_PER_NODE', '2')
+
+from hpl_cuda import HplCuda
+from tmpi     import tMPI
+from utils    import autovivification
+
+# T/V is always WR00C4C4, whatever BCAST/RFACT/NDIV/PFACT/NBMIN in HPL.dat
+reference = {
+    (120000, 256, 1, 4): ('61.7', '1.820e+04'),
+    (120000, 256, 2, 2): ('50.2', '2.240e+04') }
+
+class Reference(HplCuda):
+    def run(self):
+        self.output = os.path.join(self.outdir, f'HPL{self.tag}.out')
+
+        with open(self.output, 'w') as fh:
+            for size in self.size:
+                for blocksize in self.blocksize:
+                    for p, q in zip(self.pgrid, self.qgrid):
+                        time, gflops = reference.get((size, blocksize, p, q), ('10.0', f'{size/1000*p*q:.3e}'))
+
+                        fh.write(f'WR00C4C4 {size:>12} {blocksize:>5} {p:>5} {q:>5} {time:>18} {gflops:>18}\n')
+                        fh.write('||Ax-b||_oo/(eps*(||A||_oo*||x||_oo+||b||_oo)*N)=        0.0028 ...... PASSED\n')
+
+        self.parse()
+
+failed = []
+
+def check(name, condition):
+    print(f'{name:<24} : {"ok" if condition else "FAILED"}')
+
+    if not condition:
+        failed.append(name)
+
+hpl = Reference(
+    prefix    = tmpdir,
+    outdir    = os.path.join(tmpdir, 'output'),
+    size      = [120000],
+    memory    = [],
+    mpi       = tMPI(node=2, task=2, omp=4, gpu=2))
+
+os.makedirs(hpl.outdir, exist_ok=True)
+
+# parse: one row per PxQ (HplCuda defaults NB to 288)
+hpl.blocksize        = [256]
+hpl.pgrid, hpl.qgrid = [1, 2], [4, 2]
+hpl.run()
+
+check('parse rows', len(hpl.result) == 2)
+check('parse gflops', sorted(max(hpl.result[key]['gflops']) for key in hpl.result) == [18.2, 22.4])
+
+# batch: points differing in PxQ and BCAST are fanned out by N/NB/PxQ
+hpl.result = autovivification()
+
+points  = [
+    {'size': 120000, 'blocksize': 256, 'grid': (1, 4), 'bcast': 0},
+    {'size': 120000, 'blocksize': 256, 'grid': (2, 2), 'bcast': 0},
+    {'size': 120000, 'blocksize': 256, 'grid': (2, 2), 'bcast': 3} ]
+
+results = hpl.batch(points)
+
+check('batch attribution', all(results))
+check('batch 1x4', [max(result['gflops']) for result in results[0].values()] == [18.2])
+check('batch 2x2', [max(result['gflops']) for result in results[1].values()] == [22.4])
+check('batch bcast', [max(result['gflops']) for result in results[2].values()] == [22.4])
+
+# tune: NB x PxQ probes are scored, BCAST x PFACT stage is skipped
+hpl.tune()
+
+check('tune best', os.path.exists(os.path.join(hpl.outdir, 'HPL-tuned.dat')))
+check('tune stages', hpl.rung <= len(hpl.budgets))
+
+if not args.keep:
+    import shutil
+    shutil.rmtree(tmpdir)
+
+if failed:
+    print(f'failed: {" ".join(failed)}')
+    sys.exit(1)
@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+
+from mdtest  import Mdtest
+from openmpi import OpenMPI
+
+mdtest = Mdtest(
+    prefix = '../run/MDTEST', 
+    mpi    = OpenMPI() )
+
+mdtest.getopt()
+mdtest.info()
+mdtest.download() 
+mdtest.build()
+mdtest.run() 
+mdtest.summary()
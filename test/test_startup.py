@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+import re
+import sys
+import argparse
+import subprocess
+
+# import time of benchmark modules in fresh interpreters (ms)
+modules = ['stream', 'stream_cuda', 'iozone', 'ior', 'qe_cuda', 'gromacs_cuda', 'hpl_cuda', 'hpcg_cuda', 'scan']
+
+parser = argparse.ArgumentParser(description='Import time guard')
+parser.add_argument('--budget'   , type=float, default=100, help='maximum import time per module in ms (default: 100)')
+parser.add_argument('--repeat'   , type=int  , default=5  , help='number of repeated imports (default: 5)')
+parser.add_argument('--construct', type=float, default=10 , help='maximum Bmt() construction time in ms (default: 10)')
+args   = parser.parse_args()
+
+failed = []
+
+for module in modules:
+    timing = []
+
+    for i in range(args.repeat):
+        pipe = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'], text=True, capture_output=True)
+
+        # last line is the cumulative time of the top-level module (us)
+        timing.append(int(re.search(r'\|\s+(\d+)\s+\|\s+' + module + r'$', pipe.stderr, re.MULTILINE).group(1))/1000)
+
+    # best of repeats is the least noisy estimate
+    best = min(timing)
+
+    print(f'{module:<12} : {best:7.1f} ms')
+
+    if best > args.budget:
+        failed.append(module)
+
+# construction of a benchmark object without samplers (settle, telemetry, energy, accounting)
+construct = '''
+import sys, time, bmt
+start = time.perf_counter()
+bmt.Bmt()
+print((time.perf_counter() - start)*1000, *[name for name in ['settle', 'telemetry', 'energy', 'accounting'] if name in sys.modules])
+'''
+
+timing = []
+
+for i in range(args.repeat):
+    pipe = subprocess.run([sys.executable, '-c', construct], text=True, capture_output=True, check=True)
+
+    elapsed, *samplers = pipe.stdout.split()
+    timing.append(float(elapsed))
+
+best = min(timing)
+
+print(f'{"Bmt()":<12} : {best:7.1f} ms {" ".join(samplers)}')
+
+if best > args.construct or samplers:
+    failed.append('Bmt()')
+
+if failed:
+    print(f'exceeded budget: {" ".join(failed)}')
+    sys.exit(1)